@@ -0,0 +1,159 @@
+import os
+import io
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import contextlib
+from datetime import datetime
+
+from pmla_synthetic import generate_workbook
+from pmla_data_ingestor import ingest_data
+from pmla_case_store import save_cases
+from pmla_disk_cache import WorkbookCache
+from pmla_workbook import load_main_frame
+from pmla_explorer import PMLAExplorer
+from pmla_filters import FilterEngine, STATUS_FILTERS
+
+DEFAULT_SCALES = [1000, 5000, 20000]
+DEFAULT_RESULTS_PATH = "benchmark_results.jsonl"
+SEARCH_QUERIES = 50
+FILTER_SELECTIONS = 50
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+TRACE_MEMORY = False # set by --memory; tracing slows Python-heavy stages, so it is opt-in
+
+def measure(fn, *args, **kwargs):
+    """
+    (result, seconds, peak MB) of one call with the pipeline's own prints swallowed.
+    Peak MB is the tracemalloc peak of this process (None unless TRACE_MEMORY);
+    allocations in worker processes and Arrow's pool are not seen.
+    """
+    if TRACE_MEMORY:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    peak = None
+    if TRACE_MEMORY:
+        peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+    return result, seconds, peak
+
+def run_searches(explorer, queries):
+    return sum(len(explorer.search(q)) for q in queries)
+
+def run_filters(df, engine, selections):
+    rows = 0
+    for years, ios, min_poc, action in selections:
+        rows += len(df[engine.mask(years, ios, min_poc, action)])
+    return rows
+
+def bench_scale(cases, sheets, workdir, workers=None, seed=0):
+    """Times every stage once at one scale; returns a list of result records."""
+    rng = random.Random(seed)
+    path = os.path.join(workdir, f"synthetic_{cases}.xlsx")
+    records = []
+
+    def record(stage, seconds, peak_mb, **extra):
+        peak_mb = None if peak_mb is None else round(peak_mb, 1)
+        records.append({"stage": stage, "seconds": round(seconds, 6), "peak_mb": peak_mb, **extra})
+        print(f"  {stage:<22} {seconds:10.6f}s  {'' if peak_mb is None else f'{peak_mb:.1f} MB':>10}  {extra or ''}")
+
+    _, s, m = measure(generate_workbook, path, cases, sheets, seed=seed)
+    record("generate", s, m, bytes=os.path.getsize(path))
+
+    master, s, m = measure(ingest_data, path, workers=workers)
+    record("ingest_data", s, m, cases=len(master))
+
+    data = open(path, "rb").read()
+    cache = WorkbookCache(os.path.join(workdir, f"cache_{cases}"))
+    df, s, m = measure(load_main_frame, data, cache)
+    record("process_data_cold", s, m, rows=len(df))
+    _, s, m = measure(load_main_frame, data, cache)
+    record("process_data_warm", s, m)
+
+    store = os.path.join(workdir, f"store_{cases}")
+    index_path = os.path.join(workdir, f"index_{cases}.pkl")
+    measure(save_cases, master, store)
+    explorer, s, m = measure(PMLAExplorer, store, index_path)
+    record("explorer_load", s, m)
+    ecirs = list(explorer.cases)
+    persons = sorted({p for c in explorer.cases.values() for p in c["persons_involved"]})
+    queries = [rng.choice(ecirs)[-8:] if i % 2 else rng.choice(persons or ecirs).split()[-1] for i in range(SEARCH_QUERIES)]
+    hits, s, m = measure(run_searches, explorer, queries)
+    record("explorer_search", s / len(queries), m, queries=len(queries), hits=hits)
+
+    engine, s, m = measure(FilterEngine, df)
+    record("filter_index", s, m)
+    selections = [
+        (rng.sample(engine.years, min(3, len(engine.years))), rng.sample(engine.io_values, min(2, len(engine.io_values))) if i % 2 else [],
+         rng.choice([0, 10, 100]), rng.choice(STATUS_FILTERS))
+        for i in range(FILTER_SELECTIONS)
+    ]
+    rows, s, m = measure(run_filters, df, engine, selections)
+    record("filter_apply", s / len(selections), m, selections=len(selections), rows=rows)
+    return records
+
+def compare(results, baseline_path):
+    """Prints each stage's time against the latest baseline record for the same scale and stage."""
+    baseline = {}
+    with open(baseline_path) as f:
+        for line in f:
+            r = json.loads(line)
+            baseline[(r["cases"], r["sheets"], r["stage"], r.get("traced", False))] = r
+    print(f"\n--- Compared with {baseline_path} ---")
+    for r in results:
+        base = baseline.get((r["cases"], r["sheets"], r["stage"], r["traced"]))
+        if base and base["seconds"]:
+            ratio = r["seconds"] / base["seconds"]
+            flag = "  <-- slower" if ratio > 1.2 else ""
+            print(f"  {r['cases']:>7} {r['stage']:<22} {base['seconds']:9.3f}s -> {r['seconds']:9.3f}s  x{ratio:.2f}{flag}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the PMLA pipeline on synthetic workbooks.")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="Comma-separated master case counts")
+    parser.add_argument("--sheets", type=int, default=8, help="Secondary sheets per workbook")
+    parser.add_argument("--workers", type=int, default=None, help="ingest_data worker processes")
+    parser.add_argument("--out", default=DEFAULT_RESULTS_PATH, help="JSONL file the results are appended to")
+    parser.add_argument("--compare", help="Earlier results JSONL to compare against")
+    parser.add_argument("--workdir", help="Where workbooks, stores and caches go (default: a temp dir)")
+    parser.add_argument("--memory", action="store_true", help="Record tracemalloc peaks (slows timings; compared only with traced runs)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    TRACE_MEMORY = args.memory
+
+    run = {
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "traced": args.memory,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() if args.workdir is None else contextlib.nullcontext(args.workdir) as workdir:
+        os.makedirs(workdir, exist_ok=True)
+        for cases in (int(s) for s in args.scales.split(",")):
+            print(f"--- {cases} cases x {args.sheets} sheets ---")
+            for r in bench_scale(cases, args.sheets, workdir, args.workers, args.seed):
+                results.append({**run, "cases": cases, "sheets": args.sheets, **r})
+
+    with open(args.out, "a") as f:
+        for r in results:
+            f.write(json.dumps(r) + "\n")
+    print(f"\nAppended {len(results)} results to {args.out}")
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,217 @@
+import os
+import json
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pmla_instrument import stage
+from pmla_conversions import parse_dates
+
+DEFAULT_STORE_PATH = r"c:\Users\HP\Downloads\EDOTS PMLA data\master_cases_store"
+
+# One Parquet file per table, all keyed by ecir_no.
+# Child tables keep the field names of the MasterCase record types.
+# Date and amount columns have a <name>_text companion holding the cell text when it isn't a date/number.
+SCHEMAS = {
+    "cases": pa.schema([
+        ("ecir_no", pa.string()),
+        ("ecir_date", pa.timestamp("ns")),
+        ("ecir_date_text", pa.string()),
+        ("status", pa.string()),
+        ("zonal_office", pa.string()),
+        ("sheets", pa.list_(pa.string())),
+    ]),
+    "searches": pa.schema([
+        ("ecir_no", pa.string()),
+        ("date", pa.timestamp("ns")),
+        ("date_text", pa.string()),
+        ("location", pa.string()),
+        ("sheet", pa.string()),
+        ("raw", pa.string()),
+    ]),
+    "arrests": pa.schema([
+        ("ecir_no", pa.string()),
+        ("name", pa.string()),
+        ("date", pa.timestamp("ns")),
+        ("date_text", pa.string()),
+        ("sheet", pa.string()),
+    ]),
+    "paos": pa.schema([
+        ("ecir_no", pa.string()),
+        ("date", pa.timestamp("ns")),
+        ("date_text", pa.string()),
+        ("amount", pa.float64()),
+        ("amount_text", pa.string()),
+        ("sheet", pa.string()),
+        ("data", pa.string()),
+    ]),
+    "pcs": pa.schema([
+        ("ecir_no", pa.string()),
+        ("date", pa.timestamp("ns")),
+        ("date_text", pa.string()),
+        ("amount", pa.float64()),
+        ("amount_text", pa.string()),
+        ("sheet", pa.string()),
+        ("data", pa.string()),
+    ]),
+    "persons": pa.schema([
+        ("ecir_no", pa.string()),
+        ("name", pa.string()),
+        ("person_id", pa.string()),
+        ("sheets", pa.list_(pa.string())),
+    ]),
+}
+TABLES = tuple(SCHEMAS)
+CHILD_TABLES = ("searches", "arrests", "paos", "pcs")
+FINGERPRINTS_FILE = "fingerprints.json"
+
+def table_path(name, path=DEFAULT_STORE_PATH):
+    return os.path.join(path, f"{name}.parquet")
+
+def _to_frame(rows, schema):
+    """
+    Record dicts -> DataFrame with the schema's columns coerced to their types.
+    Dates are read like the dashboard reads them (parse_dates: ISO as-is, Excel
+    serials, other text day-first); cells that aren't dates, or amounts that
+    aren't numbers, keep their text in the <name>_text column so nothing is lost.
+    """
+    df = pd.DataFrame(rows, columns=schema.names)
+    for field in schema:
+        col = df[field.name]
+        if pa.types.is_timestamp(field.type):
+            col = col.astype(object)
+            dates = parse_dates(col)[0] if len(col) else pd.Series(pd.NaT, index=col.index, dtype="datetime64[ns]")
+            df[field.name] = dates.astype("datetime64[ns]")
+            unread = col.notna() & dates.isna()
+            df[field.name + "_text"] = col.where(unread, None).map(lambda v: v if v is None else str(v))
+        elif pa.types.is_floating(field.type):
+            numbers = pd.to_numeric(col, errors="coerce")
+            df[field.name] = numbers
+            if field.name + "_text" in schema.names:
+                unread = col.notna() & numbers.isna()
+                text = col.where(unread, None).map(lambda v: v if v is None else str(v))
+                df[field.name + "_text"] = text.where(unread, df[field.name + "_text"])
+        elif pa.types.is_list(field.type):
+            df[field.name] = col.map(lambda v: sorted(map(str, v)) if isinstance(v, (set, list, tuple)) else [])
+        else:
+            df[field.name] = col.where(col.isna(), col.astype(str))
+    return df
+
+def cases_to_frames(cases):
+    """Flattens {ecir: MasterCase} into one DataFrame per store table."""
+    rows = {name: [] for name in TABLES}
+    for ecir, case in cases.items():
+        rows["cases"].append({
+            "ecir_no": ecir,
+            "ecir_date": case.ecir_date,
+            "status": case.status,
+            "zonal_office": case.zonal_office,
+            "sheets": case.sheets,
+        })
+        for name in CHILD_TABLES:
+            for record in getattr(case, name):
+                rows[name].append(dict(record._asdict(), ecir_no=ecir))
+        for person in case.persons_involved:
+            rows["persons"].append({
+                "ecir_no": ecir,
+                "name": person,
+                "person_id": case.person_ids.get(person),
+                "sheets": case.person_sheets.get(person, ()),
+            })
+    return {name: _to_frame(rows[name], SCHEMAS[name]) for name in TABLES}
+
+def save_cases(cases, path=DEFAULT_STORE_PATH, fingerprints=None):
+    """
+    Writes the case map as a columnar store (a directory of Parquet tables).
+    The directory is built alongside and swapped in, so readers never see a partial store.
+    `fingerprints` (per-sheet content hashes) is saved with it for incremental runs.
+    """
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, df in cases_to_frames(cases).items():
+        with stage("store_save", table=name) as s:
+            table = pa.Table.from_pandas(df, schema=SCHEMAS[name], preserve_index=False)
+            pq.write_table(table, table_path(name, tmp_path), compression="zstd")
+            s.add_rows(len(df))
+    if fingerprints is not None:
+        with open(os.path.join(tmp_path, FINGERPRINTS_FILE), "w") as f:
+            json.dump(fingerprints, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+def load_fingerprints(path=DEFAULT_STORE_PATH):
+    """Per-sheet fingerprints saved with the store, or None if there are none."""
+    try:
+        with open(os.path.join(path, FINGERPRINTS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_person_ids(path=DEFAULT_STORE_PATH):
+    """{raw name: person ID} from an existing store, {} if there is none; keeps IDs stable across full re-ingests."""
+    try:
+        df = read_table("persons", path, columns=["name", "person_id"])
+    except (OSError, ValueError):
+        return {}
+    return {name: pid for name, pid in zip(df["name"], df["person_id"]) if _plain(pid) is not None}
+
+def read_table(name, path=DEFAULT_STORE_PATH, columns=None):
+    """Reads one store table, optionally projected to `columns` (only those are decoded)."""
+    return pq.read_table(table_path(name, path), columns=columns).to_pandas()
+
+def _fold_text(record):
+    # A date column that isn't a date gives back its cell text; the _text columns leave the record
+    for key in [k for k in record if k.endswith("_text")]:
+        text = record.pop(key)
+        if record.get(key[:-len("_text")]) is None and text is not None:
+            record[key[:-len("_text")]] = text
+    return record
+
+def _plain(value):
+    # Timestamps back to ISO strings and nulls to None, matching MasterCase.to_dict()
+    if value is None or value is pd.NaT or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+def load_cases(path=DEFAULT_STORE_PATH, tables=TABLES):
+    """
+    Loads the store back into {ecir: case dict} in the MasterCase.to_dict() shape.
+    `tables` projects the load: ("persons",) reads only ecir_no and person names.
+    """
+    if "cases" in tables:
+        base = read_table("cases", path)
+    else:
+        base = read_table("cases", path, columns=["ecir_no"])
+
+    cases = {}
+    for row in base.to_dict("records"):
+        case = _fold_text({k: _plain(v) for k, v in row.items()})
+        if "sheets" in case:
+            case["sheets"] = list(case["sheets"])
+        if "persons" in tables:
+            case["persons_involved"] = []
+            case["person_ids"] = {}
+        for name in CHILD_TABLES:
+            if name in tables:
+                case[name] = []
+        cases[case["ecir_no"]] = case
+
+    for name in tables:
+        if name == "cases":
+            continue
+        if name == "persons":
+            df = read_table(name, path, columns=["ecir_no", "name", "person_id"])
+            for ecir, person, pid in zip(df["ecir_no"], df["name"], df["person_id"]):
+                cases[ecir]["persons_involved"].append(person)
+                if _plain(pid) is not None:
+                    cases[ecir]["person_ids"][person] = pid
+            continue
+        df = read_table(name, path)
+        fields = [c for c in df.columns if c != "ecir_no"]
+        for ecir, record in zip(df["ecir_no"], df[fields].to_dict("records")):
+            cases[ecir][name].append(_fold_text({k: _plain(v) for k, v in record.items()}))
+    return cases
@@ -0,0 +1,107 @@
+import os
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Above this many points the PoC-vs-PAO chart is decimated (or binned) server-side
+MAX_CHART_POINTS = int(os.environ.get("PMLA_CHART_MAX_POINTS", 5000))
+GRID_SIZE = 64 # cells per axis for decimation and density bins
+HOVER_COLUMNS = 5
+
+def _grid_codes(x, y, grid):
+    """Cell number of each point on a grid x grid lattice over log-scaled amounts."""
+    def axis(v):
+        v = np.log1p(np.clip(np.nan_to_num(v), 0, None))
+        span = v.max() - v.min()
+        if span == 0:
+            return np.zeros(len(v), dtype=np.int64)
+        return np.minimum(((v - v.min()) / span * grid).astype(np.int64), grid - 1)
+    return axis(x) * grid + axis(y)
+
+def _cell_quota(counts, max_points):
+    """
+    Points kept per cell: one for every occupied cell, so no region disappears,
+    and the rest of the budget shared out in proportion to each cell's other points.
+    Sums to exactly `max_points` whenever there are no more occupied cells than that.
+    """
+    occupied = counts > 0
+    cells = int(occupied.sum())
+    spare = max(max_points - cells, 0)
+    extra = counts - occupied
+    total = int(extra.sum())
+    if not total:
+        return occupied.astype(np.int64)
+    exact = extra * (spare / total)
+    share = np.floor(exact).astype(np.int64)
+    # Largest remainders take the points the rounding left over
+    left = spare - int(share.sum())
+    if left > 0:
+        share[np.argsort(share - exact, kind="stable")[:left]] += 1
+    return np.where(occupied, 1 + share, 0)
+
+def decimate(df, x, y, max_points=MAX_CHART_POINTS, grid=GRID_SIZE, seed=0):
+    """
+    At most `max_points` rows of `df` that keep the shape of the x/y plane: every
+    occupied cell keeps at least one point (outliers survive) and dense cells keep
+    a share proportional to their count, by a seeded random sample. With more
+    occupied cells than `max_points`, one point per cell is drawn and then a
+    random subset of those. Row order is kept.
+    """
+    if len(df) <= max_points:
+        return df
+    codes = _grid_codes(df[x].to_numpy(dtype=float), df[y].to_numpy(dtype=float), grid)
+    quota = _cell_quota(np.bincount(codes), max_points)
+
+    # Rank each point within its cell in a random order, keep the first quota of each cell
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(codes))
+    by_cell = order[np.argsort(codes[order], kind="stable")]
+    sorted_codes = codes[by_cell]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    rank = np.arange(len(codes)) - np.repeat(starts, np.diff(np.r_[starts, len(codes)]))
+    kept = by_cell[rank < quota[sorted_codes]]
+    if len(kept) > max_points:
+        kept = rng.choice(kept, max_points, replace=False)
+    return df.iloc[np.sort(kept)]
+
+def density_figure(df, x, y, grid=GRID_SIZE, title=None):
+    """Heatmap of case counts binned server-side; the payload is grid x grid whatever the row count."""
+    counts, xedges, yedges = np.histogram2d(df[x].fillna(0), df[y].fillna(0), bins=grid)
+    fig = go.Figure(go.Heatmap(
+        z=np.where(counts.T > 0, counts.T, np.nan),
+        x=(xedges[:-1] + xedges[1:]) / 2,
+        y=(yedges[:-1] + yedges[1:]) / 2,
+        colorscale="Viridis",
+        colorbar=dict(title="Cases"),
+        hovertemplate=f"{x}: %{{x:,.2f}}<br>{y}: %{{y:,.2f}}<br>Cases: %{{z}}<extra></extra>",
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+def poc_pao_figure(df, mode="Auto", max_points=MAX_CHART_POINTS):
+    """
+    PoC vs Attachment chart with a bounded payload.
+    'Auto' plots every case up to `max_points`, then a decimated sample;
+    'Density' always bins. Returns (figure, points plotted).
+    """
+    if mode == "Density":
+        fig = density_figure(df, 'PoC_Value', 'PAO_Value', title="PoC vs Attachment (Case Density)")
+        shown = len(df)
+    else:
+        plotted = decimate(df, 'PoC_Value', 'PAO_Value', max_points)
+        fig = px.scatter(
+            plotted,
+            x='PoC_Value',
+            y='PAO_Value',
+            size='Arrest_Count',
+            color='Year',
+            hover_data=list(df.columns[:HOVER_COLUMNS]), # Show first few cols on hover
+            title="PoC vs Attachment (Size = Arrests)",
+        )
+        shown = len(plotted)
+    fig.update_layout(template="plotly_dark", height=500)
+
+    # Add reference line
+    max_val = max(df['PoC_Value'].max(), 1) if len(df) else 1
+    fig.add_shape(type="line", line=dict(dash="dash", width=1, color="gray"), x0=0, y0=0, x1=max_val, y1=max_val)
+    return fig, shown
@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+
+from pmla_schema import SCHEMAS
+
+# Derived column -> source column heading (matched case-insensitively as a substring)
+VALUE_COLUMNS = {
+    'PoC_Value': 'Details of PoC identified (in Rs. Cr.), as per ECIR',
+    'PAO_Value': 'Total value of PAOs issued',
+    'Arrest_Count': 'No. of arrest',
+    'Search_Count': 'No. of searches conducted',
+}
+
+# Cells that mean "nothing recorded" rather than a malformed value
+BLANK_TOKENS = ['', '-', '--', 'nil', 'na', 'n/a', 'none', 'nan']
+UNIT_RE = r'(crores?|cr|lakhs?|lacs?)\.?\s*$'
+NOISE_RE = r'₹|rs\.?|inr|/-|crores?|cr\.?|lakhs?|lacs?|,|\s'
+EXCEL_SERIAL_RANGE = (20000, 80000) # day numbers for ~1954-2119
+# Text columns with at most this share of distinct values are stored as categoricals
+CATEGORY_MAX_RATIO = 0.5
+# Derived whole-number columns, downcast to the smallest integer type that holds them
+INTEGER_COLUMNS = ['Arrest_Count', 'Search_Count', 'Year']
+LABEL_NAME_CHARS = 40
+
+def resolve_value_columns(columns):
+    """
+    Finds every source column process_data needs in a single pass over the headers.
+    Returns {role: column or None} for the VALUE_COLUMNS targets plus 'date', 'name' and 'ecir'.
+    """
+    roles = dict.fromkeys([*VALUE_COLUMNS, 'poc_fallback', 'date', 'name', 'ecir'])
+    targets = {internal: key.lower() for internal, key in VALUE_COLUMNS.items()}
+    for c in columns:
+        lower = c.lower()
+        for internal, key in targets.items():
+            if roles[internal] is None and key in lower:
+                roles[internal] = c
+        if roles['poc_fallback'] is None and 'poc' in lower and 'cr' in lower:
+            roles['poc_fallback'] = c
+        if roles['date'] is None and 'date' in lower and ('ecir' in lower or 'case' in lower):
+            roles['date'] = c
+        if roles['name'] is None and 'name' in lower and 'case' in lower:
+            roles['name'] = c
+        if roles['ecir'] is None and "ECIR" in c and "No" in c:
+            roles['ecir'] = c
+    roles['PoC_Value'] = roles['PoC_Value'] or roles.pop('poc_fallback')
+    roles.pop('poc_fallback', None)
+    return roles
+
+def value_column_roles(columns):
+    """resolve_value_columns through the schema registry, so each column layout is resolved once."""
+    return SCHEMAS.roles("value_columns", columns, resolve_value_columns)
+
+def _blank_mask(values, text):
+    return values.isna().to_numpy() | text.isin(BLANK_TOKENS).to_numpy()
+
+def read_amounts(values):
+    """
+    Reads a whole column of amounts: Indian digit grouping ('1,23,45,678.50'),
+    'Rs.'/'₹'/'/-' decorations and Cr/crore/lakh units (lakh -> 0.01 Cr).
+    Returns (amounts, blank): amounts is NaN where a cell is blank or unreadable,
+    blank marks the cells that mean "nothing recorded".
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float), values.isna().to_numpy()
+
+    text = values.astype(str).str.strip().str.lower()
+    blank = _blank_mask(values, text)
+    unit = text.str.extract(UNIT_RE, expand=False)
+    scale = np.where(unit.str.startswith('la', na=False), 0.01, 1.0)
+    amounts = pd.to_numeric(text.str.replace(NOISE_RE, '', regex=True), errors='coerce') * scale
+    return amounts.where(~blank), blank
+
+def parse_amounts(values):
+    """
+    read_amounts for the dashboard: blank cells become 0.0. Returns (amounts,
+    failures) where failures counts non-blank cells that could not be read;
+    those are also 0.0.
+    """
+    amounts, blank = read_amounts(values)
+    failures = int((amounts.isna().to_numpy() & ~blank).sum())
+    return amounts.fillna(0.0), failures
+
+def parse_dates(values):
+    """
+    Parses a whole column of dates: datetime cells and ISO text as-is, Excel
+    serial day numbers, and other text day-first (Indian dd.mm.yyyy / dd/mm/yyyy).
+    Returns (dates, failures) where failures counts non-blank cells left as NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values, 0
+
+    text = values.astype(str).str.strip()
+    blank = _blank_mask(values, text.str.lower())
+    dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+
+    iso = text.str.match(r'\d{4}-\d{1,2}-\d{1,2}').to_numpy() & ~blank
+    dates[iso] = pd.to_datetime(text[iso], errors='coerce', format='ISO8601')
+
+    serial_days = pd.to_numeric(text, errors='coerce')
+    serial = serial_days.between(*EXCEL_SERIAL_RANGE).to_numpy() & ~blank
+    dates[serial] = pd.Timestamp('1899-12-30') + pd.to_timedelta(serial_days[serial], unit='D')
+
+    rest = ~(iso | serial | blank)
+    if rest.any():
+        dates[rest] = pd.to_datetime(text[rest], errors='coerce', dayfirst=True, format='mixed')
+
+    failures = int((dates.isna().to_numpy() & ~blank).sum())
+    return dates, failures
+
+def build_case_ids(ecir):
+    """
+    Stable row keys: the stripped ECIR, with '#2', '#3'... on its repeat rows
+    (in sheet order) and 'Row <n>' where the ECIR is blank.
+    """
+    text = ecir.astype(str).str.strip()
+    blank = ecir.isna() | text.isin(BLANK_TOKENS)
+    text = text.where(~blank, "Row " + pd.Series(np.arange(1, len(ecir) + 1), index=ecir.index).astype(str))
+    occurrence = text.groupby(text, sort=False).cumcount() + 1
+    return text.where(occurrence == 1, text + "#" + occurrence.astype(str))
+
+def case_label(case_id, name=None):
+    """Dropdown label 'Case_ID - <first 40 chars of case name>...', built when displayed."""
+    if name is None:
+        return str(case_id)
+    name = "" if pd.isna(name) else str(name)
+    return f"{case_id} - {name[:LABEL_NAME_CHARS]}..."
+
+def convert_frame(df):
+    """
+    Adds the typed analytics columns (PoC_Value, PAO_Value, Arrest_Count,
+    Search_Count, ECIR_Date_Clean, Year, Case_ID) to the main sheet.
+    Returns a report {derived column: {"source": column, "failures": count}}.
+    """
+    roles = value_column_roles(df.columns)
+    report = {}
+
+    for internal in VALUE_COLUMNS:
+        source = roles[internal]
+        if source:
+            df[internal], failures = parse_amounts(df[source])
+        else:
+            df[internal], failures = 0.0, 0
+        report[internal] = {"source": source, "failures": failures}
+
+    # Extract Year from Date
+    if roles['date']:
+        df['ECIR_Date_Clean'], failures = parse_dates(df[roles['date']])
+        df['Year'] = df['ECIR_Date_Clean'].dt.year.fillna(0).astype(int)
+        report['ECIR_Date_Clean'] = {"source": roles['date'], "failures": failures}
+    else:
+        df['Year'] = 0
+
+    # Case key (dropdown labels are derived from it on demand, see case_label)
+    if roles['ecir']:
+        df['Case_ID'] = build_case_ids(df[roles['ecir']])
+
+    return report
+
+def _is_text(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return False
+    if pd.api.types.is_string_dtype(values.dtype) and values.dtype != object:
+        return True
+    return values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) == 'string'
+
+def _as_category(values, max_ratio):
+    present = int(values.notna().sum())
+    if not present or values.nunique(dropna=True) > max_ratio * present:
+        return None
+    return values.astype('category')
+
+def _as_small_int(values):
+    if not pd.api.types.is_numeric_dtype(values.dtype):
+        return None
+    v = values.to_numpy(dtype=float)
+    if not np.isfinite(v).all() or (v % 1).any():
+        return None
+    return pd.to_numeric(values.astype(np.int64), downcast='unsigned' if (v >= 0).all() else 'integer')
+
+def compact_frame(df, max_category_ratio=CATEGORY_MAX_RATIO):
+    """
+    Shrinks the processed main sheet in place: text columns with few distinct
+    values (zones, IOs, status) become categoricals and the whole-number
+    INTEGER_COLUMNS the smallest integer type that holds them. A column is only
+    replaced if that saves memory.
+    Returns {column: {"dtype": new dtype, "before": bytes, "after": bytes}}.
+    """
+    report = {}
+    for i, col in enumerate(df.columns):
+        values = df.iloc[:, i]
+        if col in INTEGER_COLUMNS:
+            compact = _as_small_int(values)
+        elif _is_text(values):
+            compact = _as_category(values, max_category_ratio)
+        else:
+            continue
+        if compact is None:
+            continue
+        before = int(values.memory_usage(index=False, deep=True))
+        after = int(compact.memory_usage(index=False, deep=True))
+        if after < before:
+            df.isetitem(i, compact)
+            report[str(col)] = {"dtype": str(compact.dtype), "before": before, "after": after}
+    return report
@@ -1,11 +1,25 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 
 import io
+import os
 import ast
+import tempfile
+
+from pmla_data_ingestor import ingest_data
+from pmla_graph import CaseGraph
+from pmla_disk_cache import WorkbookCache, content_hash
+from pmla_filters import FilterEngine, CaseIndex, STATUS_FILTERS
+from pmla_conversions import value_column_roles
+from pmla_workbook import LazyWorkbook, load_main_frame
+from pmla_charts import poc_pao_figure, MAX_CHART_POINTS
+from pmla_export import write_export, with_detected_header, EXPORT_FORMATS
+from pmla_llm_context import build_context, estimate_tokens, DEFAULT_TOKEN_BUDGET
+from pmla_llm_cache import ResponseCache, request_key
+from pmla_llm_stream import StreamingCall
+from pmla_instrument import stage, recent_records
 
 # --- Configuration ---
 st.set_page_config(page_title="ED Command Center", layout="wide", page_icon="🛡️")
@@ -42,83 +56,74 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Logic: Data Processing ---
-@st.cache_data
-def process_data(file):
-    xls = pd.ExcelFile(file)
-    sheets = {sheet: xls.parse(sheet) for sheet in xls.sheet_names}
-    
-    # 1. Automatic Main Sheet Detection
-    main_sheet_name = next((s for s in sheets if 'sheet 1' in s.lower()), None)
-    if not main_sheet_name:
-         main_sheet_name = list(sheets.keys())[0] # Fallback
-         
-    df = sheets[main_sheet_name]
-    
-    # 2. Header Cleanup
-    # Scan first 20 rows for "ECIR" to find likely header
-    header_idx = -1
-    for i, row in df.head(20).iterrows():
-        row_str = " ".join([str(x) for x in row if pd.notna(x)])
-        if "ECIR No" in row_str or "Case No" in row_str:
-            header_idx = i
-            break
-            
-    if header_idx != -1:
-        df.columns = df.iloc[header_idx]
-        df = df.iloc[header_idx+1:].reset_index(drop=True)
+# Disk cache shared across server processes/replicas (PMLA_CACHE_DIR, PMLA_CACHE_MAX_BYTES)
+WORKBOOK_CACHE = WorkbookCache()
+# Gemini responses keyed by model, prompt and filtered data (PMLA_LLM_CACHE_TTL, PMLA_LLM_CACHE_MAX_BYTES)
+LLM_CACHE = ResponseCache()
 
-    # Standardize Column Names
-    df.columns = [str(c).strip() for c in df.columns]
+@st.cache_resource(show_spinner=False, max_entries=4)
+def process_data(upload_key, _data):
+    # Parsed workbooks persist on disk keyed by upload content, so restarts and
+    # new replicas skip the Excel parse for workbooks already seen.
+    # One read-only, memory-mapped frame per upload is shared by every session;
+    # sessions only keep their own filter masks, so never modify it in place.
+    return load_main_frame(_data, WORKBOOK_CACHE, shared=True)
 
-    # 3. Type Conversion & Enrichment
-    # Convert Numeric Columns
-    def clean_currency(val):
-        if pd.isna(val) or val == '': return 0.0
-        try:
-            val_str = str(val).replace(',', '')
-            return float(val_str)
-        except:
-            return 0.0
-            
-    cols_map = {
-        'Details of PoC identified (in Rs. Cr.), as per ECIR': 'PoC_Value',
-        'Total value of PAOs issued': 'PAO_Value',
-        'No. of arrest': 'Arrest_Count',
-        'No. of searches conducted': 'Search_Count'
-    }
-    
-    for target_key, target_internal in cols_map.items():
-        # strict or fuzzy match
-        details_col = next((c for c in df.columns if target_key.lower() in c.lower()), None)
-        # fallback for PoC
-        if not details_col and 'PoC' in target_key:
-             details_col = next((c for c in df.columns if 'poc' in c.lower() and 'cr' in c.lower()), None)
-        
-        if details_col:
-            df[target_internal] = df[details_col].apply(clean_currency)
-        else:
-            df[target_internal] = 0.0
-
-    # Extract Year from Date
-    # Find Date Column
-    date_col = next((c for c in df.columns if 'date' in c.lower() and ('ecir' in c.lower() or 'case' in c.lower())), None)
-    if date_col:
-        df['ECIR_Date_Clean'] = pd.to_datetime(df[date_col], errors='coerce')
-        df['Year'] = df['ECIR_Date_Clean'].dt.year.fillna(0).astype(int)
-    else:
-        df['Year'] = 0
-        
-    # Helper for Dropdown Label
-    # Find Name column
-    name_col = next((c for c in df.columns if 'name' in c.lower() and 'case' in c.lower()), None)
-    ecir_col = next((c for c in df.columns if "ECIR" in c and "No" in c), None)
+@st.cache_resource(show_spinner=False, max_entries=4)
+def open_workbook(upload_key, _data):
+    # Lazy sheet access shared by every session viewing the same upload
+    return LazyWorkbook(_data, WORKBOOK_CACHE, upload_key)
+
+@st.cache_resource(show_spinner=False)
+def build_filter_engine(upload_key, _df):
+    # One filter index per processed workbook, shared by every session and rerun
+    return FilterEngine(_df)
+
+@st.cache_resource(show_spinner=False)
+def build_case_index(upload_key, _df):
+    # Case_ID -> row position, shared like the filter engine
+    return CaseIndex(_df)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_llm_context(upload_key, mask_key, budget, _df, _io_col, _pc_col):
+    # Token-budgeted summary of the filtered cases, rebuilt only when the selection or budget changes
+    roles = value_column_roles(_df.columns)
+    return build_context(_df, roles['ecir'], roles['name'], _io_col, _pc_col, budget)
 
-    if ecir_col and name_col:
-         df['Dropdown_Label'] = df[ecir_col].astype(str) + " - " + df[name_col].astype(str).str[:40] + "..."
-    elif ecir_col:
-         df['Dropdown_Label'] = df[ecir_col].astype(str)
+def ask_model(client, model, prompt, data_fingerprint):
+    # Cached answer, or a streamed one rendered as it arrives. The model call runs on a worker
+    # thread; any rerun (e.g. the Stop button) interrupts the loop, which cancels the call.
+    live = st.empty()
 
-    return df, sheets
+    def call():
+        stream = StreamingCall(client, model, prompt)
+        text = ""
+        for part in stream.stream(heartbeat=True):
+            if part and part["kind"] == "text":
+                text += part["data"]
+            live.markdown(text + "▌")
+        return stream.parts
+
+    with stage("llm_call", model=model, prompt_chars=len(prompt)) as s:
+        parts, source = LLM_CACHE.fetch(request_key(model, prompt, data_fingerprint), model, call)
+        s.set(source=source, response_chars=sum(len(p["data"]) for p in parts if p["kind"] == "text"))
+    live.empty()
+    return parts, source
+
+def discard_export():
+    # Deletes the session's previous export file, if any
+    export = st.session_state.pop("export", None)
+    if export:
+        try:
+            os.remove(export["path"])
+        except OSError:
+            pass
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_case_graph(upload_key, _file_bytes):
+    # Co-accused graph over every sheet of the workbook (persons resolved by the ingestor)
+    cases = ingest_data(io.BytesIO(_file_bytes), workers=1)
+    return CaseGraph.from_cases(cases)
 
 # --- UI: Sidebar & Auth ---
 st.sidebar.title("🛡️ ED Command Center")
@@ -128,17 +133,28 @@ uploaded_file = st.sidebar.file_uploader("Upload PMLA Master Excel", type=["xlsx
 if uploaded_file:
     with st.spinner('Ingesting and Linking Data...'):
         try:
-            df, all_sheets_dict = process_data(uploaded_file)
+            upload_key = content_hash(uploaded_file.getvalue())
+            df = process_data(upload_key, uploaded_file.getvalue())
+            filter_engine = build_filter_engine(upload_key, df)
+            case_index = build_case_index(upload_key, df)
+            workbook = open_workbook(upload_key, uploaded_file.getvalue())
         except Exception as e:
             st.error(f"Data Processing Error: {e}")
             st.stop()
     
+    # --- Sidebar: Data Quality ---
+    parse_failures = {k: v for k, v in df.attrs.get("conversion_report", {}).items() if v["failures"]}
+    if parse_failures:
+        with st.sidebar.expander(f"⚠️ {sum(v['failures'] for v in parse_failures.values())} unreadable cells"):
+            for target, info in parse_failures.items():
+                st.caption(f"**{info['source']}** → {target}: {info['failures']} cells could not be parsed (treated as blank)")
+
     # --- Sidebar: Global Filters ---
     st.sidebar.divider()
     st.sidebar.subheader("🔎 Global Filters")
     
     # Year Filter
-    available_years = sorted([y for y in df['Year'].unique() if y > 0], reverse=True)
+    available_years = filter_engine.years
     if available_years:
         selected_years = st.sidebar.multiselect("Select Year(s)", available_years, default=available_years[:3])
     else:
@@ -146,11 +162,11 @@ if uploaded_file:
     
     # IO Filter / IO Name
     # Try to find IO or Investigating Officer Column
-    io_col = next((c for c in df.columns if ('io' in c.lower() or 'investigating' in c.lower() or 'officer' in c.lower()) and 'zonal' not in c.lower() and 'type' not in c.lower()), None)
+    io_col = filter_engine.io_col
     
     selected_ios = []
     if io_col:
-        ios = sorted(df[io_col].dropna().astype(str).unique())
+        ios = filter_engine.io_values
         selected_ios = st.sidebar.multiselect("Investigating Officer (IO)", ios)
     else:
         st.sidebar.warning("Could not automatically detect 'IO' column.")
@@ -159,28 +175,17 @@ if uploaded_file:
     min_poc = st.sidebar.slider("Min PoC (₹ Cr)", 0, 5000, 0, step=10)
     
     # Action Filter
-    action_type = st.sidebar.radio("Status Filter", ["All Cases", "Arrests Made", "Attachment Done", "Prosecution Filed"])
+    action_type = st.sidebar.radio("Status Filter", STATUS_FILTERS)
 
     # --- APPLY FILTERS ---
-    filtered_df = df.copy()
-    
-    if selected_years:
-        filtered_df = filtered_df[filtered_df['Year'].isin(selected_years)]
-        
-    if selected_ios and io_col:
-        filtered_df = filtered_df[filtered_df[io_col].astype(str).isin(selected_ios)]
-        
-    filtered_df = filtered_df[filtered_df['PoC_Value'] >= min_poc]
-    
-    if action_type == "Arrests Made":
-        filtered_df = filtered_df[filtered_df['Arrest_Count'] > 0]
-    elif action_type == "Attachment Done":
-        filtered_df = filtered_df[filtered_df['PAO_Value'] > 0]
-    elif action_type == "Prosecution Filed":
-        # Find PC column
-        pc_col = next((c for c in df.columns if 'pc' in c.lower() and 'filed' in c.lower()), None)
-        if pc_col:
-             filtered_df = filtered_df[filtered_df[pc_col].astype(str).str.contains('Yes', case=False, na=False)]
+    # Intersect the precomputed masks; the frame is only indexed once, never copied
+    with stage("filter_apply") as s:
+        filter_mask = filter_engine.mask(selected_years, selected_ios, min_poc, action_type)
+        filtered_df = df if filter_mask.all() else df[filter_mask] # no copy of the shared frame when nothing is filtered out
+        s.add_rows(len(filtered_df))
+
+    # --- Sidebar: Diagnostics ---
+    show_diagnostics = st.sidebar.toggle("🩺 Show diagnostics", key="show_diagnostics")
 
     # --- MAIN DASHBOARD ---
     
@@ -199,42 +204,56 @@ if uploaded_file:
         # BUBBLE CHART
         st.write("### 📈 PoC vs Attachment Efficacy")
         if not filtered_df.empty:
-            fig = px.scatter(
-                filtered_df, 
-                x='PoC_Value', 
-                y='PAO_Value',
-                size='Arrest_Count', 
-                color='Year',
-                hover_data=filtered_df.columns[:5], # Show first few cols on hover
-                title="PoC vs Attachment (Size = Arrests)",
-                template="plotly_dark",
-                height=500
-            )
-            # Add reference line
-            max_val = max(filtered_df['PoC_Value'].max(), 1)
-            fig.add_shape(type="line", line=dict(dash="dash", width=1, color="gray"), x0=0, y0=0, x1=max_val, y1=max_val)
+            # Large selections are decimated or binned server-side so the chart payload stays bounded;
+            # zooming into a PoC range with few enough cases plots them at full resolution
+            z1, z2 = st.columns([1, 3])
+            chart_mode = z1.radio("Render", ["Auto", "Density"], horizontal=True, key="chart_mode")
+            poc_max = float(max(filtered_df['PoC_Value'].max(), 1))
+            zoom = z2.slider("Zoom PoC range (₹ Cr)", 0.0, poc_max, (0.0, poc_max), key="chart_zoom")
+            chart_df = filtered_df[filtered_df['PoC_Value'].between(*zoom)]
+
+            with stage("chart_build", mode=chart_mode) as s:
+                fig, shown = poc_pao_figure(chart_df, chart_mode)
+                s.add_rows(shown)
+            if chart_mode == "Auto" and shown < len(chart_df):
+                st.caption(f"Showing a sample of {shown:,} of {len(chart_df):,} cases: sparse regions are kept "
+                           f"and dense ones thinned in proportion. "
+                           f"Narrow the PoC range to {MAX_CHART_POINTS:,} cases or fewer for full resolution.")
             st.plotly_chart(fig, use_container_width=True)
             
             # EXPORT
+            # Built only on request, chunk by chunk, into a temp file; the session keeps
+            # only the path of its last export, never the payload
             st.write("### 📥 Export Data")
-            csv = filtered_df.to_csv(index=False).encode('utf-8')
-            st.download_button("Download Filtered Report (CSV)", csv, "pmla_filtered_report.csv", "text/csv")
+            e1, e2 = st.columns([2, 1])
+            export_fmt = e1.selectbox("Format", list(EXPORT_FORMATS), key="export_fmt", label_visibility="collapsed")
+            export_sig = (upload_key, content_hash(filter_mask.tobytes()), export_fmt)
+            ext, mime = EXPORT_FORMATS[export_fmt]
+            if e2.button("Prepare Export", use_container_width=True):
+                discard_export()
+                with st.spinner(f"Writing {export_fmt} export..."):
+                    with stage("export", format=export_fmt) as s:
+                        fd, path = tempfile.mkstemp(prefix="pmla_export_", suffix=f".{ext}")
+                        with os.fdopen(fd, "wb") as f:
+                            write_export(filtered_df, export_fmt, f, workbook, case_index.ecir_col)
+                        st.session_state.export = {"signature": export_sig, "path": path}
+                        s.add_rows(len(filtered_df))
+            export = st.session_state.get("export")
+            if export and export["signature"] == export_sig and os.path.exists(export["path"]):
+                with open(export["path"], "rb") as f:
+                    st.download_button(f"Download Filtered Report ({export_fmt})", f, f"pmla_filtered_report.{ext}", mime)
         else:
             st.info("No data matches the current filters.")
 
     with tab_drill:
         # ECIR Selector from FILTERED list - RESTORED NAME
-        if 'Dropdown_Label' in filtered_df.columns:
-            case_options = filtered_df['Dropdown_Label'].unique()
-            selected_label = st.selectbox("Select Case to Inspect", case_options)
+        if case_index.positions:
+            # Options are Case_IDs (unique even for repeated ECIRs); labels are only for display
+            selected_case = st.selectbox("Select Case to Inspect", filtered_df['Case_ID'], format_func=case_index.label)
             
-            # Find ECIR from label
-            if selected_label:
-                selected_ecir = selected_label.split(" - ")[0]
-                # Find ECIR col again
-                ecir_col_drill = next((c for c in filtered_df.columns if "ECIR" in c and "No" in c), None)
-                
-                case_row = filtered_df[filtered_df[ecir_col_drill].astype(str) == selected_ecir].iloc[0]
+            if selected_case:
+                selected_ecir = case_index.ecirs[selected_case]
+                case_row = case_index.row(df, selected_case)
                 
                 # --- CHEVRON FLOW (Reused) ---
                 reg_date = str(case_row.get('ECIR_Date_Clean', 'N/A')).split(' ')[0]
@@ -243,7 +262,7 @@ if uploaded_file:
                 pao_v = float(case_row['PAO_Value'])
                
                 # PC Status
-                pc_col_drill = next((c for c in filtered_df.columns if 'pc' in c.lower() and 'filed' in c.lower()), None)
+                pc_col_drill = case_index.pc_col
                 pc_status = "Yes" if pc_col_drill and 'Yes' in str(case_row[pc_col_drill]) else "No"
 
                 st.markdown(f"""
@@ -261,7 +280,7 @@ if uploaded_file:
                 with c1:
                     st.write("**Case Details:**")
                     # Clean dictionary for display (remove internal helpers)
-                    disp_dict = {k:v for k,v in case_row.astype(str).to_dict().items() if k not in ['ECIR_Date_Clean', 'Dropdown_Label']}
+                    disp_dict = {k:v for k,v in case_row.astype(str).to_dict().items() if k not in ['ECIR_Date_Clean', 'Case_ID']}
                     st.json(disp_dict)
                 with c2:
                     st.write("**Financial Gap Analysis:**")
@@ -275,12 +294,57 @@ if uploaded_file:
                     ])
                     # Fix Dark Mode for this Chart
                     fig_gap.update_layout(template="plotly_dark", height=300)
-                    st.plotly_chart(fig_gap, key=f"drill_{selected_ecir}", use_container_width=True)
+                    st.plotly_chart(fig_gap, key=f"drill_{selected_case}", use_container_width=True)
                     
                     if gap > 0:
                         st.error(f"⚠️ Unattached PoC Gap: ₹{gap:,.2f} Cr")
                     else:
                         st.success("✅ Fully Attached / Excess Attachment")
+
+                # CO-ACCUSED NETWORK
+                with st.expander("🕸️ Co-accused Network"):
+                    if st.toggle("Link cases through shared accused (reads all sheets)", key="graph_enabled"):
+                        with st.spinner("Building co-accused graph..."):
+                            graph = build_case_graph(upload_key, uploaded_file.getvalue())
+                        if selected_ecir.strip() not in graph.case_pos:
+                            st.info("This case has no recorded accused in the linked sheets.")
+                        else:
+                            g1, g2 = st.columns(2)
+                            hops = g1.slider("Hops", 1, 4, 1, key="graph_hops")
+                            min_shared = g2.slider("Min shared accused", 1, 5, 1, key="graph_min_shared")
+                            ecir_key = selected_ecir.strip()
+                            shared = graph.shared_accused(ecir_key, min_shared)
+                            near = graph.neighbourhood(ecir_key, hops)
+                            st.caption(f"Accused: {', '.join(graph.persons_of(ecir_key)) or 'None recorded'} | "
+                                       f"Network size: {len(graph.component_of(ecir_key))} cases | "
+                                       f"Within {hops} hop(s): {len(near)} cases")
+                            if shared:
+                                st.dataframe(pd.DataFrame({
+                                    "Linked ECIR": list(shared.keys()),
+                                    "Shared Accused": list(shared.values()),
+                                    "Hops": [near.get(e, 1) for e in shared],
+                                }), hide_index=True, use_container_width=True)
+                            else:
+                                st.info(f"No other case shares {min_shared}+ accused with this one.")
+
+                # SOURCE SHEETS
+                with st.expander(f"📄 Source Sheets ({len(workbook.sheet_names)})"):
+                    dims = {s: workbook.dimensions(s) for s in workbook.sheet_names}
+                    source_sheet = st.selectbox(
+                        "Sheet", workbook.sheet_names, index=None, placeholder="Choose a sheet to search for this case",
+                        format_func=lambda s: f"{s} (size unknown)" if None in dims[s] else f"{s} ({dims[s][0]} rows x {dims[s][1]} cols)",
+                        key="source_sheet",
+                    )
+                    if source_sheet:
+                        with st.spinner(f"Reading '{source_sheet}'..."):
+                            # Re-headed below any banner rows, as in the export
+                            sheet_df = with_detected_header(workbook.sheet(source_sheet))
+                        ecir_key = selected_ecir.strip()
+                        hits = sheet_df.astype(str).apply(lambda col: col.str.contains(ecir_key, regex=False)).any(axis=1)
+                        if hits.any():
+                            st.dataframe(sheet_df[hits].astype(str), use_container_width=True)
+                        else:
+                            st.info(f"'{source_sheet}' has no rows mentioning {ecir_key}.")
         else:
             st.error("Dropdown labels could not be generated.")
 
@@ -302,6 +366,15 @@ if uploaded_file:
                 # "gemini-3-pro-image-preview" for visually amazing infographics
                 # "gemini-2.0-flash-exp" as safe fallback if 3 is not out for this user yet
                 
+                # Analysis context: pre-aggregated summary of the filtered cases, cut to the token budget
+                data_fingerprint = f"{upload_key}:{content_hash(filter_mask.tobytes())}"
+                context_budget = st.slider("Analysis context budget (tokens)", 1000, 32000, DEFAULT_TOKEN_BUDGET, step=1000, key="context_budget")
+                analysis_context, context_report = build_llm_context(
+                    upload_key, data_fingerprint, context_budget, filtered_df, filter_engine.io_col, case_index.pc_col
+                )
+                st.caption(f"Analysis context: ~{context_report['tokens']:,} of {context_budget:,} tokens"
+                           + (f" (trimmed: {', '.join(context_report['truncated'])})" if context_report['truncated'] else ""))
+
                 # Initialize Chat State
                 if "messages" not in st.session_state:
                     st.session_state.messages = []
@@ -321,17 +394,23 @@ if uploaded_file:
                              st.markdown(message["content"])
 
                 # Input
+                if st.session_state.get("llm_stop"):
+                    st.info("⏹️ Generation stopped.")
                 if user_input := st.chat_input("Ask for analysis, infographics, or details..."):
                     st.chat_message("user").markdown(user_input)
                     st.session_state.messages.append({"role": "user", "content": user_input})
                     
+                    st.button("⏹️ Stop generating", key="llm_stop")
                     with st.spinner("Agent is determining the best tool..."):
                         try:
                             # 1. Determine Intent
                             is_image_intent = any(k in user_input.lower() for k in ['image', 'infographic', 'draw', 'picture', 'visual', 'chart', 'graph'])
                             
                             # 2. Select Model ID & Construct Prompt
-                            response = None
+                            # Calls go through LLM_CACHE: repeats are served from disk and
+                            # identical in-flight requests from other sessions share one call;
+                            # fresh answers stream in with a timeout (PMLA_LLM_TIMEOUT)
+                            parts = None
                             
                             if is_image_intent:
                                 st.caption("🎨 activating **Nano-Banana-Pro** (Visual Engine)...")
@@ -355,65 +434,41 @@ if uploaded_file:
                                         "Do not generate text explanations. Just generate the image."
                                     )
                                     
-                                    response = client.models.generate_content(
-                                        model=image_model_id,
-                                        contents=img_prompt
-                                    )
+                                    parts, source = ask_model(client, image_model_id, img_prompt, data_fingerprint)
                                 except Exception as e_img:
                                     st.warning(f"Nano-Banana (Image) failed: {e_img}. Trying fallback...")
                                     # Fallback to 2.0 Flash Exp which might handle it or just give text
-                                    response = client.models.generate_content(
-                                        model='gemini-2.0-flash-exp',
-                                        contents=f"Generate an image for {user_input}"
-                                    )
+                                    parts, source = ask_model(client, 'gemini-2.0-flash-exp', f"Generate an image for {user_input}", data_fingerprint)
 
                             else:
                                 # TEXT/ANALYSIS MODE
                                 st.caption("🧠 activating **Gemini-2.0-Flash** (Deep Reasoning)...")
                                 analysis_model_id = "gemini-2.0-flash-exp"
                                 
-                                # Full Context Pattern
+                                # Compact Context Pattern
                                 final_prompt = f"""
                                 SYSTEM: You are a Senior PMLA Analyst.
-                                DATA CONTEXT:\n{csv_context}\n
+                                DATA CONTEXT:\n{analysis_context}\n
                                 USER QUERY: {user_input}
                                 """
+                                st.caption(f"Prompt size: ~{estimate_tokens(final_prompt):,} tokens")
                                 
-                                response = client.models.generate_content(
-                                    model=analysis_model_id,
-                                    contents=final_prompt
-                                )
+                                parts, source = ask_model(client, analysis_model_id, final_prompt, data_fingerprint)
                             
+                            if source != "model":
+                                st.caption("♻️ Answered from cache" if source == "cache" else "♻️ Shared with an identical request in progress")
+
                             # 4. Handle Response (Text vs Image)
-                            handled_image = False
-                            
-                            if response.parts:
-                                for part in response.parts:
-                                    # Check for Inline Data (Image)
-                                    # The SDK wrapper might differ slightly, checking attributes safely
-                                    if hasattr(part, 'inline_data') and part.inline_data:
-                                        from PIL import Image
-                                        import io
-                                        # Decode bytes
-                                        img_data = part.inline_data.data
-                                        if isinstance(img_data, str): # Base64 string in some versions
-                                            import base64
-                                            img_bytes = base64.b64decode(img_data)
-                                            img = Image.open(io.BytesIO(img_bytes))
-                                        else:
-                                            img = Image.open(io.BytesIO(img_data))
-                                            
-                                        st.image(img, caption="Generated Logic", use_container_width=True)
-                                        st.session_state.messages.append({"role": "assistant", "content": "[Generated Image]"})
-                                        handled_image = True
-                                        
-                                    elif hasattr(part, 'text') and part.text:
-                                         st.markdown(part.text)
-                                         st.session_state.messages.append({"role": "assistant", "content": part.text})
-
-                            # Fallback if no parts found (rare)
-                            if not response.parts and response.text:
-                                st.markdown(response.text)
+                            # Parts arrive decoded (image bytes, text) whether fresh or cached
+                            for part in parts:
+                                if part["kind"] == "image":
+                                    from PIL import Image
+                                    img = Image.open(io.BytesIO(part["data"]))
+                                    st.image(img, caption="Generated Logic", use_container_width=True)
+                                    st.session_state.messages.append({"role": "assistant", "content": "[Generated Image]"})
+                                else:
+                                    st.markdown(part["data"])
+                                    st.session_state.messages.append({"role": "assistant", "content": part["data"]})
 
                         except Exception as e:
                             st.error(f"Analysis Error: {e}")
@@ -422,6 +477,29 @@ if uploaded_file:
             except Exception as import_err:
                  st.error(f"Critical SDK Error: {import_err}")
                  st.error("Please ensure `google-genai` is installed.")
+
+    # --- DIAGNOSTICS ---
+    # Stage timings recorded by this server process (ingestion, parsing, filters, charts, LLM calls);
+    # set PMLA_METRICS_LOG to also append them to a JSONL file
+    if show_diagnostics:
+        st.divider()
+        st.subheader("🩺 Diagnostics")
+        records = pd.DataFrame(recent_records())
+        if records.empty:
+            st.info("No stages recorded yet.")
+        else:
+            summary = records.groupby("stage").agg(
+                calls=("seconds", "size"), total_s=("seconds", "sum"), max_s=("seconds", "max"),
+                rows=("rows", "sum"), peak_mb=("peak_mb", "max"),
+            ).sort_values("total_s", ascending=False)
+            st.dataframe(summary, use_container_width=True)
+            st.dataframe(records.iloc[::-1].head(200), hide_index=True, use_container_width=True)
+        compaction = pd.DataFrame.from_dict(df.attrs.get("compaction_report", {}), orient="index")
+        if not compaction.empty:
+            compaction["saved_mb"] = (compaction["before"] - compaction["after"]) / 1024 ** 2
+            st.caption(f"Main frame: {df.memory_usage(deep=True).sum() / 1024 ** 2:,.1f} MB in memory; "
+                       f"compact dtypes saved {compaction['saved_mb'].sum():,.1f} MB")
+            st.dataframe(compaction.sort_values("saved_mb", ascending=False), use_container_width=True)
 else:
     st.image("https://upload.wikimedia.org/wikipedia/en/c/cf/Enforcement_Directorate.svg", width=100)
     st.title("PMLA Command Center")
@@ -1,23 +1,80 @@
 
 import pandas as pd
+import numpy as np
+from pandas.io.parsers import TextParser
 import json
 from datetime import datetime
 import re
+import io
+import os
+import glob
+import argparse
+import contextlib
+import sys
+import hashlib
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat
+from typing import NamedTuple
+from openpyxl import load_workbook
+from pmla_case_store import save_cases, load_fingerprints, load_person_ids, read_table, CHILD_TABLES, DEFAULT_STORE_PATH
+from pmla_entity_resolution import resolve_persons
+from pmla_instrument import stage, timed
+from pmla_schema import SCHEMAS
+from pmla_conversions import read_amounts
 
 FILE_PATH = r"c:\Users\HP\Downloads\EDOTS PMLA data\edots excel sheet PMLA.xlsx"
+MASTER_SHEET = 'list of pmla cases'
+HEADER_SCAN_ROWS = 15
+FINGERPRINT_VERSION = 5 # bump when ingestion output changes, to force a full re-ingest
+WORKBOOK_GLOB = "*.xlsx"
+# Zonal office and period from an export's file name: 'EDOTS Delhi 2024-03.xlsx' -> ('Delhi', '2024-03')
+SOURCE_NAME_PATTERN = r"^(?:edots[\s_-]*)?(?P<zone>.*?)[\s_-]*(?P<period>\d{4}[-_.]?\d{2})?$"
+
+class SearchRecord(NamedTuple):
+    date: object
+    location: object
+    sheet: str
+    raw: object = None # row text, kept only with keep_raw
+
+class ArrestRecord(NamedTuple):
+    name: object
+    date: object
+    sheet: str
+
+class AmountRecord(NamedTuple):
+    """A PAO or PC row."""
+    date: object
+    amount: object
+    sheet: str
+    data: object = None # row text, kept only with keep_raw
+    amount_text: object = None # the amount cell as written when it is not a readable amount
+
+RECORD_TYPES = {"searches": SearchRecord, "arrests": ArrestRecord, "paos": AmountRecord, "pcs": AmountRecord}
 
 class MasterCase:
+    __slots__ = ("ecir_no", "ecir_date", "status", "zonal_office", "person_ids",
+                 "searches", "arrests", "paos", "pcs", "sheets", "person_sheets")
+
     def __init__(self, ecir_no):
         self.ecir_no = ecir_no
         self.ecir_date = None
         self.status = "Unknown"
         self.zonal_office = None
-        self.persons_involved = set()
-        self.searches = []
-        self.arrests = []
-        self.paos = []
-        self.pcs = []
-        self.raw_data = {} # Store raw rows for debugging
+        self.person_ids = {} # raw name -> resolved person ID (see pmla_entity_resolution)
+        self.searches = [] # SearchRecord
+        self.arrests = [] # ArrestRecord
+        self.paos = [] # AmountRecord
+        self.pcs = [] # AmountRecord
+        self.sheets = set() # Sheets that mention this case (provenance for incremental runs)
+        self.person_sheets = {} # name -> sheets it was read from
+
+    @property
+    def persons_involved(self):
+        """Names read for this case (a set-like view of person_sheets)."""
+        return self.person_sheets.keys()
 
     def to_dict(self):
         return {
@@ -26,30 +83,104 @@ class MasterCase:
             "status": self.status,
             "zonal_office": self.zonal_office,
             "persons_involved": list(self.persons_involved),
-            "searches": self.searches,
-            "arrests": self.arrests,
-            "paos": self.paos,
-            "pcs": self.pcs
+            "person_ids": self.person_ids,
+            "searches": [r._asdict() for r in self.searches],
+            "arrests": [r._asdict() for r in self.arrests],
+            "paos": [r._asdict() for r in self.paos],
+            "pcs": [r._asdict() for r in self.pcs]
         }
 
+    def add_person(self, name, sheet):
+        self.person_sheets.setdefault(sys.intern(name), set()).add(sys.intern(sheet))
+
+    def merge(self, other):
+        """Folds another partial record for the same ECIR into this one."""
+        if self.ecir_date is None:
+            self.ecir_date = other.ecir_date
+        self.person_ids.update(other.person_ids)
+        self.sheets.update(other.sheets)
+        for name, sheets in other.person_sheets.items():
+            self.person_sheets.setdefault(name, set()).update(sheets)
+        self.searches.extend(other.searches)
+        self.arrests.extend(other.arrests)
+        self.paos.extend(other.paos)
+        self.pcs.extend(other.pcs)
+
+    def merge_export(self, other):
+        """
+        Folds in the same case as read from a later export (e.g. next month's).
+        Fields the later export has win; child records are a multiset union, so
+        a row repeated in cumulative exports is kept as often as one export has it.
+        """
+        if other.ecir_date is not None:
+            self.ecir_date = other.ecir_date
+        if other.status != "Unknown":
+            self.status = other.status
+        if other.zonal_office is not None:
+            self.zonal_office = other.zonal_office
+        self.sheets.update(other.sheets)
+        for name, sheets in other.person_sheets.items():
+            self.person_sheets.setdefault(name, set()).update(sheets)
+        for records, incoming in ((self.searches, other.searches), (self.arrests, other.arrests),
+                                  (self.paos, other.paos), (self.pcs, other.pcs)):
+            have = Counter(map(_record_key, records))
+            for r in incoming:
+                key = _record_key(r)
+                if have[key]:
+                    have[key] -= 1
+                else:
+                    records.append(r)
+
+    def drop_sheets(self, sheets, master_sheet):
+        """Removes everything the given sheets contributed. Returns False if nothing is left."""
+        for records in (self.searches, self.arrests, self.paos, self.pcs):
+            records[:] = [r for r in records if r.sheet not in sheets]
+        for name in list(self.person_sheets):
+            self.person_sheets[name] -= sheets
+            if not self.person_sheets[name]:
+                del self.person_sheets[name]
+                self.person_ids.pop(name, None)
+        if master_sheet in sheets:
+            self.ecir_date = None
+        self.sheets -= sheets
+        return bool(self.sheets)
+
     def __repr__(self):
         return f"<ECIR: {self.ecir_no} | Status: {self.status} | Persons: {len(self.persons_involved)}>"
 
+def _record_key(record):
+    # A child record's identity across exports: its values, not its sheet or row text
+    return tuple(None if v is None or v is pd.NaT or (isinstance(v, float) and v != v) else v
+                 for f, v in zip(record._fields, record) if f not in ("sheet", "raw", "data"))
+
 def normalize_ecir(val):
     if pd.isna(val):
         return None
     val = str(val).strip()
     return val
 
+def ecir_key(ecir):
+    """Matching key of an ECIR across workbooks: case and whitespace ignored."""
+    return re.sub(r"\s+", "", ecir).upper()
+
 def find_header_row(df):
     """
     Scans the first 15 rows to find a header containing 'ECIR No' or 'Sl. No.'.
-    Returns the index of the header row.
+    Returns the index of the header row (0 when none is found).
+    """
+    header_idx = detect_header_row(df.values.tolist())
+    return 0 if header_idx is None else header_idx
+
+def detect_header_row(rows):
+    """
+    Same heuristic as find_header_row, over plain sequences of cell values
+    (DataFrame rows or openpyxl value tuples). Returns the row position, or
+    None when no row looks like a header (callers fall back to row 0).
     """
     prioritized_idx = -1
-    for i, row in df.iterrows():
+    for i, values in enumerate(rows):
         # Convert row to string and search for key columns roughly
-        row_str = " ".join([str(x) for x in row.values if pd.notna(x)]).lower()
+        row_str = " ".join([str(x) for x in values if pd.notna(x)]).lower()
         
         # Strict match for ECIR Number column or Case No
         if "ecir no" in row_str or "ecir_no" in row_str or "case no" in row_str:
@@ -61,28 +192,272 @@ def find_header_row(df):
              
     if prioritized_idx != -1:
         return prioritized_idx
-    return 0
+    return None
 
 def clean_column_name(col):
     return str(col).strip().replace("\n", " ").replace("  ", " ")
 
-def ingest_data():
-    xl = pd.ExcelFile(FILE_PATH)
-    cases = {} # Map ECIR No -> MasterCase object
-    
+def read_sheet(xl, sheet_name, fingerprint=False):
+    """
+    Reads a sheet exactly once and detects the header on the rows already in memory.
+    Returns a DataFrame equivalent to pd.read_excel(..., header=<detected row>).
+    With `fingerprint`, the sheet's content hash (sheet_fingerprint) is put in attrs["fingerprint"].
+    """
+    raw = xl.parse(sheet_name, header=None)
+    digest = sheet_fingerprint(raw) if fingerprint else None
+    if raw.empty:
+        df = pd.DataFrame()
+        df.attrs["fingerprint"] = digest
+        return df
+    with stage("header_detect", sheet=sheet_name) as s:
+        # Known layouts come from the schema registry; only new ones are scanned
+        header_idx, hit = SCHEMAS.header_row("pandas_sheet", raw.head(HEADER_SCAN_ROWS).values.tolist(), detect_header_row)
+        s.set(header_row=header_idx, registry_hit=hit)
+
+    # Hand the in-memory rows to pandas' own header logic (Unnamed: n, duplicate
+    # mangling, dtype inference) instead of re-opening the workbook.
+    rows = raw.astype(object).where(raw.notna(), "").values.tolist()
+    df = TextParser(rows, header=header_idx).read()
+    df.columns = [clean_column_name(c) for c in df.columns]
+    df.attrs["fingerprint"] = digest
+    return df
+
+def sheet_category(sheet_name):
+    sheet_lower = sheet_name.lower()
+    if "search" in sheet_lower: return "search"
+    if "arrest" in sheet_lower: return "arrest"
+    if "pao" in sheet_lower or "attach" in sheet_lower: return "pao"
+    if "pc" in sheet_lower or "complaint" in sheet_lower: return "pc"
+    return "other"
+
+def find_ecir_column(columns):
+    return next((c for c in columns if ("ECIR" in c or "Case" in c) and "No" in c), None)
+
+def find_ecir_date_column(columns):
+    return next((c for c in columns if "Date" in c and ("ECIR" in c or "Case" in c)), None)
+
+def resolve_column_roles(columns, ecir_col):
+    """
+    Resolves, once per sheet, which columns play each role. Each role is an
+    ordered candidate list; a row uses its first non-empty candidate.
+    """
+    cols = [c for c in columns if c != ecir_col]
+    return {
+        "date": [c for c in cols if "date" in c.lower()],
+        "location": [c for c in cols if "address" in c.lower() or "place" in c.lower()],
+        "name": [c for c in cols if "name" in c.lower()],
+        "person": [c for c in cols if "name" in c.lower() and "officer" not in c.lower()],
+        "officer": [c for c in cols if "officer" in c.lower()],
+        "amount": [c for c in cols if "value" in c.lower() or "amount" in c.lower()],
+    }
+
+def resolve_sheet_roles(columns):
+    """Every column role the ingestor reads: the ECIR and ECIR date columns plus resolve_column_roles."""
+    ecir_col = find_ecir_column(columns)
+    return {"ecir": ecir_col, "ecir_date": find_ecir_date_column(columns), **resolve_column_roles(columns, ecir_col)}
+
+def sheet_roles(columns):
+    """resolve_sheet_roles through the schema registry, so each column layout is resolved once."""
+    return SCHEMAS.roles("sheet", columns, resolve_sheet_roles)
+
+def cell_repr(val):
+    """
+    repr of a cell value, the same whichever reader produced it: numpy scalars
+    become Python values, whole-number floats (pandas pads int columns holding
+    blanks to float) become ints, and datetimes are shown as pandas Timestamps.
+    """
+    if isinstance(val, np.datetime64):
+        val = pd.Timestamp(val)
+    elif isinstance(val, np.generic):
+        val = val.item()
+    if isinstance(val, float) and val.is_integer():
+        val = int(val)
+    elif isinstance(val, datetime):
+        val = pd.Timestamp(val)
+    return repr(val)
+
+def row_text(items):
+    """Raw-row text kept with --keep-raw: str(dict)-style over (column, value) pairs of non-empty cells."""
+    return "{" + ", ".join(f"{k!r}: {cell_repr(v)}" for k, v in items) + "}"
+
+def enrich_case(case, category, sheet_name, data_row, roles, keep_raw=False):
+    """Applies one secondary-sheet row (non-empty cells, ECIR column excluded) to a case."""
+    def first(role):
+        return next((data_row[c] for c in roles[role] if c in data_row), None)
+
+    raw = row_text(data_row.items()) if keep_raw else None
+    if category == "search":
+        case.searches.append(SearchRecord(first("date"), first("location"), sheet_name, raw))
+
+    elif category == "arrest":
+        name = first("name")
+        case.arrests.append(ArrestRecord(name, first("date"), sheet_name))
+        if name is not None:
+            case.add_person(str(name), sheet_name)
+
+    elif category in ("pao", "pc"):
+        cell = first("amount")
+        amounts, blank = read_amounts(pd.Series([cell], dtype=object))
+        amount = None if pd.isna(amounts.iloc[0]) else float(amounts.iloc[0])
+        text = str(cell) if amount is None and not blank[0] else None
+        record = AmountRecord(first("date"), amount, sheet_name, raw, text)
+        (case.paos if category == "pao" else case.pcs).append(record)
+
+    # Always add names if found
+    for c in roles["person"]:
+        if c in data_row:
+            case.add_person(str(data_row[c]), sheet_name)
+    case.sheets.add(sheet_name)
+
+def _first_present(df, columns):
+    """Per row, the value of the first non-empty column in `columns` (None if all empty)."""
+    if not columns:
+        return pd.Series(None, index=df.index, dtype=object)
+    first = df[columns].astype(object).bfill(axis=1).iloc[:, 0]
+    return first.where(first.notna(), None)
+
+def _row_text(df, columns):
+    """row_text of each row's non-empty cells, built column by column."""
+    text = pd.Series("", index=df.index, dtype=object)
+    for c in columns:
+        col = df[c].astype(object)
+        present = col.notna() & (col != "")
+        piece = (repr(c) + ": " + col[present].map(cell_repr)).reindex(df.index, fill_value="")
+        sep = pd.Series(np.where(present & (text != ""), ", ", ""), index=df.index)
+        text = text + sep + piece
+    return "{" + text + "}"
+
+def enrich_from_sheet(df, sheet_name, keep_raw=False):
+    """
+    Builds the partial cases contributed by one secondary sheet.
+    Returns (cases, note); cases is None when the sheet has no ECIR column.
+
+    Column roles are resolved once, the record fields are computed column-wise
+    and rows are attached to their cases in bulk via a groupby on the ECIR.
+    Row text (SearchRecord.raw, AmountRecord.data) is only built with `keep_raw`;
+    an amount that can't be read keeps its cell text (AmountRecord.amount_text) regardless.
+    """
+    sheet_name = sys.intern(sheet_name)
+    roles = sheet_roles(df.columns)
+    ecir_col = roles["ecir"]
+    if not ecir_col:
+        # Fallback: Check for 'File No' or just 'No' if it helps, but 'Case No' covers T1
+        return None, f"  > Skipping {sheet_name}: No ECIR/Case No column found. Columns: {df.columns.tolist()[:3]}..."
+
+    category = sheet_category(sheet_name)
+
+    ecir = df[ecir_col].astype(str).str.strip().where(df[ecir_col].notna())
+    df = df[ecir.notna() & (ecir != "")]
+    ecir = ecir[df.index]
+    detail_cols = [c for c in df.columns if c != ecir_col]
+
+    # Category records, one per row, aligned with `ecir`
+    records = None
+    raw = _row_text(df, detail_cols) if keep_raw else repeat(None)
+    sheet = repeat(sheet_name)
+    if category == "search":
+        records = list(map(SearchRecord._make, zip(
+            _first_present(df, roles["date"]), _first_present(df, roles["location"]), sheet, raw)))
+    elif category == "arrest":
+        records = list(map(ArrestRecord._make, zip(
+            _first_present(df, roles["name"]), _first_present(df, roles["date"]), sheet)))
+    elif category in ("pao", "pc"):
+        cells = _first_present(df, roles["amount"])
+        amounts, blank = read_amounts(cells)
+        unread = amounts.isna() & ~blank
+        text = [str(v) if u else None for v, u in zip(cells, unread)]
+        records = list(map(AmountRecord._make, zip(
+            _first_present(df, roles["date"]), amounts.astype(object).where(amounts.notna(), None), sheet, raw, text)))
+
+    # Person names per row: every non-empty non-officer name cell
+    persons = {}
+    if roles["person"]:
+        names = df[roles["person"]].stack().dropna()
+        if not names.empty:
+            names = names.astype(str)
+            owners = ecir[names.index.get_level_values(0)].values
+            persons = pd.Series(names.values).groupby(owners, sort=False).unique().to_dict()
+
+    cases = {}
+    for key, positions in ecir.reset_index(drop=True).groupby(ecir.values, sort=False).indices.items():
+        case = MasterCase(key)
+        case.sheets.add(sheet_name)
+        if records is not None:
+            rows = [records[i] for i in positions]
+            if category == "search":
+                case.searches.extend(rows)
+            elif category == "arrest":
+                case.arrests.extend(rows)
+                for r in rows:
+                    if r.name is not None:
+                        case.add_person(str(r.name), sheet_name)
+            elif category == "pao":
+                case.paos.extend(rows)
+            else:
+                case.pcs.extend(rows)
+        for name in persons.get(key, ()):
+            case.add_person(name, sheet_name)
+        cases[key] = case
+
+    return cases, None
+
+def process_sheet(xl, sheet_name, keep_raw=False, fingerprint=False):
+    """(cases, note, content hash or None) of one secondary sheet; see enrich_from_sheet."""
+    with stage("sheet_parse", sheet=sheet_name) as s:
+        df = read_sheet(xl, sheet_name, fingerprint)
+        s.add_rows(len(df))
+    with stage("enrich", sheet=sheet_name) as s:
+        s.add_rows(len(df))
+        return (*enrich_from_sheet(df, sheet_name, keep_raw), df.attrs.get("fingerprint"))
+
+# --- Process pool plumbing: each worker opens the workbook once and reuses it ---
+_worker_xl = None
+_worker_keep_raw = False
+_worker_fingerprint = False
+
+def _init_worker(file_path, keep_raw=False, fingerprint=False):
+    global _worker_xl, _worker_keep_raw, _worker_fingerprint
+    _worker_xl = pd.ExcelFile(file_path)
+    _worker_keep_raw = keep_raw
+    _worker_fingerprint = fingerprint
+
+def _process_sheet_in_worker(sheet_name):
+    return process_sheet(_worker_xl, sheet_name, _worker_keep_raw, _worker_fingerprint)
+
+@timed("ingest_data")
+def ingest_data(file_path=FILE_PATH, workers=None, only_sheets=None, cases=None, keep_raw=False, resolve=True,
+                known_ids=None, sheet_prints=None):
+    """
+    Builds the MasterCase map from the workbook.
+    `workers` sets the Phase 2 process pool size (None = CPU count, 1 = serial).
+    `only_sheets` restricts parsing to those sheets and `cases` seeds the map;
+    together they let an incremental run re-parse just the changed sheets.
+    `keep_raw` keeps each secondary row's full text on its record.
+    `resolve=False` skips person resolution (ingest_workbooks resolves after merging);
+    `known_ids` (raw name -> person ID, e.g. from load_person_ids) keeps earlier IDs.
+    A `sheet_prints` dict is filled with the content hash of every sheet read,
+    computed from the same read (see fingerprint_sheets).
+    """
+    xl = pd.ExcelFile(file_path)
+    fingerprint = sheet_prints is not None
+    if cases is None:
+        cases = {} # Map ECIR No -> MasterCase object
+    sheet_names = [s for s in xl.sheet_names if only_sheets is None or s in only_sheets]
+
     # 1. First Pass: Identify the "Master" sheet (usually 'list of pmla cases') to initialize cases
     print("--- Phase 1: Initializing Cases ---")
-    master_sheet = 'list of pmla cases' 
+    master_sheet = MASTER_SHEET
     
-    if master_sheet in xl.sheet_names:
-        df_preview = pd.read_excel(FILE_PATH, sheet_name=master_sheet, nrows=15, header=None)
-        header_idx = find_header_row(df_preview)
-        df = pd.read_excel(FILE_PATH, sheet_name=master_sheet, header=header_idx)
-        df.columns = [clean_column_name(c) for c in df.columns]
+    if master_sheet in sheet_names:
+        with stage("sheet_parse", sheet=master_sheet) as s:
+            df = read_sheet(xl, master_sheet, fingerprint)
+            s.add_rows(len(df))
+        if fingerprint:
+            sheet_prints[master_sheet] = df.attrs["fingerprint"]
         
         # Identify key columns (Case Insensitive Search)
-        ecir_col = next((c for c in df.columns if ("ECIR" in c or "Case" in c) and "No" in c), None)
-        date_col = next((c for c in df.columns if "Date" in c and ("ECIR" in c or "Case" in c)), None)
+        roles = sheet_roles(df.columns)
+        ecir_col, date_col = roles["ecir"], roles["ecir_date"]
         
         if ecir_col:
             print(f"Processing Master Sheet '{master_sheet}' with Key col: '{ecir_col}'")
@@ -91,6 +466,7 @@ def ingest_data():
                 if ecir:
                     if ecir not in cases:
                         cases[ecir] = MasterCase(ecir)
+                    cases[ecir].sheets.add(master_sheet)
                     
                     # Populate Basic Info
                     if date_col and pd.notna(row[date_col]):
@@ -100,89 +476,436 @@ def ingest_data():
 
     # 2. Second Pass: Process ALL sheets to enrich data
     print("\n--- Phase 2: Enriching Cases from All Sheets ---")
-    for sheet_name in xl.sheet_names:
-        if sheet_name == master_sheet: continue # Already processed raw init, but can process for extra cols
-        
-        print(f"Processing '{sheet_name}'...")
-        try:
-            # Detect Header
-            df_preview = pd.read_excel(FILE_PATH, sheet_name=sheet_name, nrows=15, header=None)
-            header_idx = find_header_row(df_preview)
-            df = pd.read_excel(FILE_PATH, sheet_name=sheet_name, header=header_idx)
-            df.columns = [clean_column_name(c) for c in df.columns]
-            
-            # Find ECIR Column
-            ecir_col = next((c for c in df.columns if ("ECIR" in c or "Case" in c) and "No" in c), None)
-            if not ecir_col:
-                 # Fallback: Check for 'File No' or just 'No' if it helps, but 'Case No' covers T1
-                 print(f"  > Skipping {sheet_name}: No ECIR/Case No column found. Columns: {df.columns.tolist()[:3]}...")
-                 continue
-            
-            # Determine Sheet Type based on Name
-            sheet_lower = sheet_name.lower()
-            category = "other"
-            if "search" in sheet_lower: category = "search"
-            elif "arrest" in sheet_lower: category = "arrest"
-            elif "pao" in sheet_lower or "attach" in sheet_lower: category = "pao"
-            elif "pc" in sheet_lower or "complaint" in sheet_lower: category = "pc"
-            
-            # Iterate Rows
-            for _, row in df.iterrows():
-                ecir = normalize_ecir(row[ecir_col])
-                if not ecir: continue
-                
-                # Create if missing (some cases might originate in secondary sheets?)
-                if ecir not in cases:
-                    cases[ecir] = MasterCase(ecir)
-                
-                case = cases[ecir]
-                
-                # Extract interesting data based on category
-                # This is heuristic; we grab all non-empty columns as "details"
-                data_row = {k: v for k, v in row.items() if pd.notna(v) and k != ecir_col}
-                
-                if category == "search":
-                    # Look for date/location
-                    date_key = next((k for k in data_row if "date" in k.lower()), "Unknown Date")
-                    loc_key = next((k for k in data_row if "address" in k.lower() or "place" in k.lower()), "Unknown Loc")
-                    case.searches.append({
-                        "date": data_row.get(date_key),
-                        "location": data_row.get(loc_key),
-                        "sheet": sheet_name,
-                        "raw": str(data_row)
-                    })
-                
-                elif category == "arrest":
-                   # Look for name/date
-                    name_key = next((k for k in data_row if "name" in k.lower()), "Unknown Name")
-                    date_key = next((k for k in data_row if "date" in k.lower()), None)
-                    arrest_entry = {
-                        "name": data_row.get(name_key),
-                        "date": data_row.get(date_key),
-                        "sheet": sheet_name
-                    }
-                    case.arrests.append(arrest_entry)
-                    if name_key in data_row:
-                        case.persons_involved.add(data_row[name_key])
-
-                elif category == "pao":
-                    case.paos.append({"data": str(data_row), "sheet": sheet_name})
-                    
-                elif category == "pc":
-                    case.pcs.append({"data": str(data_row), "sheet": sheet_name})
-                
-                # Always add names if found
-                for k, v in data_row.items():
-                    if "name" in k.lower() and "officer" not in k.lower():
-                         case.persons_involved.add(str(v))
+    # Already processed raw init, but can process for extra cols
+    sheet_names = [s for s in sheet_names if s != master_sheet]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # The pool re-opens the workbook by path, so file-like uploads stay serial
+    use_pool = workers > 1 and len(sheet_names) > 1 and isinstance(file_path, (str, os.PathLike))
 
-        except Exception as e:
-            print(f"  > Error processing {sheet_name}: {e}")
+    if use_pool:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sheet_names)),
+                                 initializer=_init_worker, initargs=(file_path, keep_raw, fingerprint)) as pool:
+            futures = [pool.submit(_process_sheet_in_worker, s) for s in sheet_names]
+            # Merge in workbook order so the result matches a serial run
+            for sheet_name, future in zip(sheet_names, futures):
+                print(f"Processing '{sheet_name}'...")
+                try:
+                    _merge_sheet_result(cases, *future.result(), sheet_name=sheet_name, sheet_prints=sheet_prints)
+                except Exception as e:
+                    print(f"  > Error processing {sheet_name}: {e}")
+    else:
+        for sheet_name in sheet_names:
+            print(f"Processing '{sheet_name}'...")
+            try:
+                _merge_sheet_result(cases, *process_sheet(xl, sheet_name, keep_raw, fingerprint),
+                                    sheet_name=sheet_name, sheet_prints=sheet_prints)
+            except Exception as e:
+                print(f"  > Error processing {sheet_name}: {e}")
 
+    if resolve:
+        resolve_case_persons(cases, known_ids)
+    return cases
+
+@timed("resolve_persons")
+def resolve_case_persons(cases, known_ids=None):
+    # 3. Entity resolution: cluster name spellings into person IDs, keeping IDs given before
+    print("\n--- Phase 3: Resolving Persons ---")
+    persons = resolve_persons(cases, known_ids)
+    spellings = sum(len(c.person_ids) for c in cases.values())
+    print(f"Resolved {spellings} name mentions to {len(persons)} persons.")
+    return persons
+
+def _merge_sheet_result(cases, sheet_cases, note, digest=None, sheet_name=None, sheet_prints=None):
+    if note:
+        print(note)
+    if sheet_prints is not None and digest is not None:
+        sheet_prints[sheet_name] = digest
+    if not sheet_cases:
+        return
+    for ecir, partial in sheet_cases.items():
+        if ecir not in cases:
+            cases[ecir] = partial
+        else:
+            cases[ecir].merge(partial)
+
+# --- Multi-workbook Ingestion: one export per zonal office per period ---
+def workbook_paths(source):
+    """The workbooks `source` names: a directory's *.xlsx, a glob pattern's matches or one file."""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, WORKBOOK_GLOB))
+    elif glob.has_magic(source):
+        paths = glob.glob(source)
+    else:
+        paths = [source]
+    return sorted(p for p in paths if not os.path.basename(p).startswith("~$")) # skip Excel lock files
+
+def source_info(path, pattern=SOURCE_NAME_PATTERN):
+    """(zonal office, period) read from a workbook's file name; either may be None."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    m = re.match(pattern, stem.strip(), re.IGNORECASE)
+    if not m:
+        return None, None
+    zone, period = m.groupdict().get("zone"), m.groupdict().get("period")
+    return (sys.intern(zone.strip()) if zone and zone.strip() else None), period
+
+def _ingest_workbook(path, keep_raw=False):
+    # One workbook in a pool worker; its log is returned so the parent prints logs in order
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        cases = ingest_data(path, workers=1, keep_raw=keep_raw, resolve=False)
+    return cases, log.getvalue()
+
+def _merge_workbook_result(cases, keys, workbook_cases, zone):
+    # ECIRs are matched on ecir_key; the first spelling seen names the case
+    merged = {}
+    for ecir, case in workbook_cases.items():
+        if zone:
+            case.zonal_office = zone
+        key = ecir_key(ecir)
+        if key in merged:
+            merged[key].merge(case) # two spellings within one workbook: both are real rows
+        else:
+            merged[key] = case
+    for key, case in merged.items():
+        if key in keys:
+            cases[keys[key]].merge_export(case)
+        else:
+            keys[key] = case.ecir_no
+            cases[case.ecir_no] = case
+
+def _run_safely(fn, *args):
+    try:
+        return fn(*args)
+    except Exception as e:
+        return e
+
+@timed("ingest_workbooks")
+def ingest_workbooks(source, workers=None, keep_raw=False, name_pattern=SOURCE_NAME_PATTERN, known_ids=None):
+    """
+    Ingests every workbook of `source` (a directory, glob pattern or file) into one
+    case map, one workbook per pool worker (`workers`: None = CPU count, 1 = serial).
+
+    Results are merged in (period, path) order whatever order workers finish in,
+    so the same inputs always give the same map. Cases are matched on ecir_key;
+    each takes its zonal office from its workbook's file name (`name_pattern`, a
+    regex with 'zone' and 'period' groups) and, where exports disagree, the values
+    of the latest one (MasterCase.merge_export). Persons are resolved once over
+    the merged map, keeping `known_ids` as in ingest_data.
+    """
+    sources = sorted((re.sub(r"\D", "", source_info(p, name_pattern)[1] or ""), p) for p in workbook_paths(source))
+    if not sources:
+        raise FileNotFoundError(f"No workbooks found for {source!r}")
+    paths = [p for _, p in sources]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(paths)))
+    print(f"--- Ingesting {len(paths)} workbook(s) with {workers} worker(s) ---")
+
+    cases, keys = {}, {}
+    with (ProcessPoolExecutor(max_workers=workers) if workers > 1 else contextlib.nullcontext()) as pool:
+        if pool is None:
+            results = (_run_safely(_ingest_workbook, p, keep_raw) for p in paths)
+        else:
+            futures = [pool.submit(_ingest_workbook, p, keep_raw) for p in paths]
+            results = (_run_safely(f.result) for f in futures)
+        for i, (path, result) in enumerate(zip(paths, results), 1):
+            zone, period = source_info(path, name_pattern)
+            if isinstance(result, Exception):
+                print(f"[{i}/{len(paths)}] > Error ingesting {path}: {result}")
+                continue
+            workbook_cases, log = result
+            print(f"[{i}/{len(paths)}] {path} (zone: {zone or '?'}, period: {period or '?'}): {len(workbook_cases)} cases")
+            print(log, end="")
+            with stage("workbook_merge", workbook=os.path.basename(path)) as s:
+                _merge_workbook_result(cases, keys, workbook_cases, zone)
+                s.add_rows(len(workbook_cases))
+
+    resolve_case_persons(cases, known_ids)
+    return cases
+
+# --- Incremental Re-ingestion ---
+def sheet_fingerprint(raw):
+    """
+    Content hash of a sheet read with header=None. Only non-blank cells count,
+    keyed by column position and compared as cell_repr shows them, so blank
+    rows, trailing blank cells and a re-save that pads or re-types cells
+    (5 vs 5.0, datetime vs Timestamp) leave it unchanged.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for values in raw.itertuples(index=False, name=None):
+        cells = [f"{i}\x1f{cell_repr(v)}" for i, v in enumerate(values)
+                 if v is not None and v != "" and not (isinstance(v, float) and v != v) and v is not pd.NaT]
+        if cells:
+            h.update("\x1e".join(cells).encode("utf-8"))
+            h.update(b"\n")
+    return h.hexdigest()
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def sheet_parts(file_path):
+    """
+    {sheet name: hash of its worksheet XML part}, read from the .xlsx zip without
+    parsing any cells. Shared strings and styles (number formats decide what is a
+    date) are hashed into every sheet. None when the file isn't a readable .xlsx.
+    """
+    def digest(z, name, h):
+        with z.open(name) as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h
+
+    try:
+        with zipfile.ZipFile(file_path) as z:
+            members = set(z.namelist())
+            common = hashlib.blake2b(digest_size=16)
+            for name in ("xl/sharedStrings.xml", "xl/styles.xml"):
+                if name in members:
+                    digest(z, name, common)
+            rels = {r.get("Id"): r.get("Target") for r in ET.fromstring(z.read("xl/_rels/workbook.xml.rels"))}
+            parts = {}
+            for el in ET.fromstring(z.read("xl/workbook.xml")).iter():
+                if _local(el.tag) != "sheet":
+                    continue
+                rid = next(v for k, v in el.attrib.items() if _local(k) == "id")
+                target = rels[rid]
+                target = target.lstrip("/") if target.startswith("/") else "xl/" + target
+                parts[el.get("name")] = digest(z, target, common.copy()).hexdigest()
+            return parts
+    except (OSError, KeyError, StopIteration, zipfile.BadZipFile, ET.ParseError):
+        return None
+
+def fingerprint_sheets(file_path=FILE_PATH, keep_raw=False, previous=None, sheet_prints=None):
+    """
+    Per-sheet fingerprints in two levels: "parts", the hash of each sheet's XML
+    part (cheap, see sheet_parts), and "sheets", the content hash of its cells
+    (see sheet_fingerprint). A content hash is taken from `sheet_prints` (hashes
+    computed during an ingest's own read), reused from `previous` fingerprints
+    when the sheet's part is unchanged, and only otherwise read from the workbook.
+    `keep_raw` is recorded too, since a store built with row text can't be patched without it.
+    """
+    parts = sheet_parts(file_path) or {}
+    old_parts = (previous or {}).get("parts", {})
+    old_prints = (previous or {}).get("sheets", {})
+    prints = dict(sheet_prints or {})
+    xl = None if parts else pd.ExcelFile(file_path)
+    try:
+        names = list(parts) if parts else xl.sheet_names
+        for name in names:
+            if name in prints:
+                continue
+            if name in parts and old_parts.get(name) == parts[name] and name in old_prints:
+                prints[name] = old_prints[name]
+                continue
+            if xl is None:
+                xl = pd.ExcelFile(file_path)
+            with stage("fingerprint", sheet=name):
+                prints[name] = sheet_fingerprint(xl.parse(name, header=None))
+    finally:
+        if xl is not None:
+            xl.close()
+    return {"version": FINGERPRINT_VERSION, "keep_raw": keep_raw, "parts": parts,
+            "sheets": {name: prints[name] for name in names if name in prints}}
+
+def _from_store(val):
+    if val is None or val is pd.NaT or (isinstance(val, float) and pd.isna(val)):
+        return None
+    return val
+
+def restore_cases(store_path=DEFAULT_STORE_PATH):
+    """Rebuilds MasterCase objects, with their sheet provenance, from a saved case store."""
+    cases = {}
+    for row in read_table("cases", store_path).to_dict("records"):
+        case = MasterCase(row["ecir_no"])
+        case.ecir_date = _from_store(row["ecir_date"])
+        if case.ecir_date is None:
+            case.ecir_date = _from_store(row.get("ecir_date_text"))
+        case.status = _from_store(row["status"]) or case.status
+        zone = _from_store(row["zonal_office"])
+        case.zonal_office = sys.intern(zone) if zone else zone
+        case.sheets = set(map(sys.intern, row["sheets"]))
+        cases[case.ecir_no] = case
+
+    for name in CHILD_TABLES:
+        df = read_table(name, store_path)
+        make = RECORD_TYPES[name]
+        df["sheet"] = df["sheet"].map(sys.intern, na_action="ignore")
+        if "date_text" in df:
+            # Dates that weren't dates come back as the cell text they were
+            df["date"] = df["date"].astype(object).where(df["date"].notna(), df["date_text"])
+        # Stores written before a record field existed read it as empty
+        fields = df.reindex(columns=list(make._fields))
+        for ecir, values in zip(df["ecir_no"], fields.itertuples(index=False, name=None)):
+            getattr(cases[ecir], name).append(make._make(map(_from_store, values)))
+
+    persons = read_table("persons", store_path)
+    for ecir, name, pid, sheets in zip(persons["ecir_no"], persons["name"], persons["person_id"], persons["sheets"]):
+        case = cases[ecir]
+        name = sys.intern(name)
+        case.person_sheets[name] = set(map(sys.intern, sheets))
+        if _from_store(pid):
+            case.person_ids[name] = pid
+    return cases
+
+def ingest_incremental(file_path=FILE_PATH, store_path=DEFAULT_STORE_PATH, workers=None, keep_raw=False):
+    """
+    Re-parses only the sheets whose fingerprint changed since the store was written.
+    Their old contributions are dropped from the restored cases and replaced; the
+    rest of the store is reused as-is. Falls back to a full ingest when the store
+    has no usable fingerprints. Returns (cases, fingerprints).
+    """
+    previous = load_fingerprints(store_path)
+    if not previous or previous.get("version") != FINGERPRINT_VERSION or previous.get("keep_raw") != keep_raw:
+        print("No usable sheet fingerprints in the case store: running a full ingest.")
+        prints = {}
+        cases = ingest_data(file_path, workers, keep_raw=keep_raw, known_ids=load_person_ids(store_path), sheet_prints=prints)
+        return cases, fingerprint_sheets(file_path, keep_raw, sheet_prints=prints)
+
+    # Sheets whose XML part is unchanged are skipped unread; only the rest are hashed
+    fingerprints = fingerprint_sheets(file_path, keep_raw, previous)
+
+    old, new = previous["sheets"], fingerprints["sheets"]
+    changed = {s for s in new if old.get(s) != new[s]} | {s for s in old if s not in new}
+    cases = restore_cases(store_path)
+    if not changed:
+        print("No sheet changed since the last run.")
+        return cases, fingerprints
+
+    print(f"{len(changed)} of {len(new)} sheet(s) changed: {sorted(changed)}")
+    for ecir in list(cases):
+        if not cases[ecir].drop_sheets(changed, MASTER_SHEET):
+            del cases[ecir]
+    return ingest_data(file_path, workers, only_sheets=changed, cases=cases, keep_raw=keep_raw), fingerprints
+
+# --- Streaming Engine (openpyxl read-only) ---
+def make_columns(header_values):
+    """Header cells -> column names, mirroring pandas (Unnamed: n, duplicate .1 suffixes)."""
+    columns, seen = [], {}
+    for i, v in enumerate(header_values):
+        name = f"Unnamed: {i}" if v is None or v == "" else str(v)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(clean_column_name(name))
+    return columns
+
+def stream_sheet(ws):
+    """
+    Streams a read-only worksheet as (columns, rows). Only the first HEADER_SCAN_ROWS
+    rows are buffered for header detection; the rest are yielded straight from the
+    XML reader as {column: value} dicts of non-empty cells.
+    """
+    rows = ws.iter_rows(values_only=True)
+    head = list(islice(rows, HEADER_SCAN_ROWS))
+    if not head:
+        return [], iter(())
+    header_idx = SCHEMAS.header_row("stream_sheet", head, detect_header_row)[0]
+    columns = make_columns(head[header_idx])
+    body = chain(head[header_idx + 1:], rows)
+    del head
+
+    def records():
+        for values in body:
+            yield {k: v for k, v in zip(columns, values) if v is not None and v != ""}
+
+    return columns, records()
+
+@timed("ingest_data_streaming")
+def ingest_data_streaming(file_path=FILE_PATH, keep_raw=False, known_ids=None):
+    """
+    Bounded-memory variant of ingest_data built on openpyxl's read_only row iterator.
+    No sheet is ever materialized: rows are mapped into MasterCase records as they
+    stream by, so peak memory is the case map itself plus a HEADER_SCAN_ROWS buffer
+    and the workbook's shared-strings table, independent of sheet length.
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    cases = {} # Map ECIR No -> MasterCase object
+    try:
+        print("--- Phase 1: Initializing Cases (streaming) ---")
+        master_sheet = MASTER_SHEET
+
+        if master_sheet in wb.sheetnames:
+            columns, rows = stream_sheet(wb[master_sheet])
+            roles = sheet_roles(columns)
+            ecir_col, date_col = roles["ecir"], roles["ecir_date"]
+
+            if ecir_col:
+                print(f"Processing Master Sheet '{master_sheet}' with Key col: '{ecir_col}'")
+                for row in rows:
+                    ecir = normalize_ecir(row.get(ecir_col))
+                    if ecir:
+                        if ecir not in cases:
+                            cases[ecir] = MasterCase(ecir)
+                        cases[ecir].sheets.add(master_sheet)
+                        if date_col and date_col in row:
+                            cases[ecir].ecir_date = row[date_col]
+            else:
+                print(f"CRITICAL: Could not find ECIR column in {master_sheet}")
+
+        print("\n--- Phase 2: Enriching Cases from All Sheets (streaming) ---")
+        for sheet_name in wb.sheetnames:
+            if sheet_name == master_sheet: continue
+
+            print(f"Processing '{sheet_name}'...")
+            try:
+                columns, rows = stream_sheet(wb[sheet_name])
+                roles = sheet_roles(columns)
+                ecir_col = roles["ecir"]
+                if not ecir_col:
+                    print(f"  > Skipping {sheet_name}: No ECIR/Case No column found. Columns: {columns[:3]}...")
+                    continue
+
+                category = sheet_category(sheet_name)
+                for row in rows:
+                    ecir = normalize_ecir(row.pop(ecir_col, None))
+                    if not ecir: continue
+                    if ecir not in cases:
+                        cases[ecir] = MasterCase(ecir)
+                    enrich_case(cases[ecir], category, sheet_name, row, roles, keep_raw)
+            except Exception as e:
+                print(f"  > Error processing {sheet_name}: {e}")
+    finally:
+        wb.close()
+
+    resolve_case_persons(cases, known_ids)
     return cases
 
 if __name__ == "__main__":
-    all_cases = ingest_data()
+    parser = argparse.ArgumentParser(description="Build the PMLA master case file from the EDOTS workbook.")
+    parser.add_argument("--file", default=FILE_PATH, help="Path to the EDOTS workbook, or a directory / glob of workbooks to merge")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 1 = serial)")
+    parser.add_argument("--zone-pattern", default=SOURCE_NAME_PATTERN,
+                        help="Regex with 'zone' and 'period' groups, matched against each workbook's file name")
+    parser.add_argument("--stream", action="store_true", help="Use the bounded-memory openpyxl streaming engine")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="Output directory of the columnar case store")
+    parser.add_argument("--json", action="store_true", help="Also write the legacy master_cases.json")
+    parser.add_argument("--full", action="store_true", help="Re-ingest every sheet instead of only the changed ones")
+    parser.add_argument("--keep-raw", action="store_true", help="Keep each search/PAO/PC row's full text (memory-heavy)")
+    args = parser.parse_args()
+    multi = os.path.isdir(args.file) or glob.has_magic(args.file)
+    if multi and args.stream:
+        parser.error("--stream reads a single workbook")
+
+    if multi:
+        # One unified store from many exports; it carries no sheet fingerprints, so the
+        # next single-workbook run against it is a full ingest
+        all_cases = ingest_workbooks(args.file, args.workers, args.keep_raw, args.zone_pattern, load_person_ids(args.store))
+        fingerprints = None
+    elif args.stream or args.full:
+        if args.stream:
+            all_cases = ingest_data_streaming(args.file, keep_raw=args.keep_raw, known_ids=load_person_ids(args.store))
+            fingerprints = fingerprint_sheets(args.file, args.keep_raw)
+        else:
+            prints = {}
+            all_cases = ingest_data(args.file, workers=args.workers, keep_raw=args.keep_raw,
+                                    known_ids=load_person_ids(args.store), sheet_prints=prints)
+            fingerprints = fingerprint_sheets(args.file, args.keep_raw, sheet_prints=prints)
+    else:
+        all_cases, fingerprints = ingest_incremental(args.file, args.store, workers=args.workers, keep_raw=args.keep_raw)
     print(f"\nTotal Master Cases Created: {len(all_cases)}")
     
     # Save a sample to verify
@@ -191,16 +914,21 @@ if __name__ == "__main__":
     for ecir in sample_ecirs:
         print(all_cases[ecir])
         
-    # JSON Dump for persistence/UI
-    output_path = r"c:\Users\HP\Downloads\EDOTS PMLA data\master_cases.json"
-    with open(output_path, "w") as f:
-        # custom converter for sets/dates
-        def default_serializer(obj):
-            if isinstance(obj, (datetime, pd.Timestamp)):
-                return obj.isoformat()
-            if isinstance(obj, set):
-                return list(obj)
-            return str(obj)
-            
-        json.dump({k: v.to_dict() for k, v in all_cases.items()}, f, default=default_serializer, indent=2)
-    print(f"Saved master object to {output_path}")
+    # Columnar case store for persistence/UI
+    save_cases(all_cases, args.store, fingerprints)
+    print(f"Saved case store to {args.store}")
+
+    if args.json:
+        # Legacy JSON dump for older consumers
+        output_path = r"c:\Users\HP\Downloads\EDOTS PMLA data\master_cases.json"
+        with open(output_path, "w") as f:
+            # custom converter for sets/dates
+            def default_serializer(obj):
+                if isinstance(obj, (datetime, pd.Timestamp)):
+                    return obj.isoformat()
+                if isinstance(obj, set):
+                    return list(obj)
+                return str(obj)
+
+            json.dump({k: v.to_dict() for k, v in all_cases.items()}, f, default=default_serializer, indent=2)
+        print(f"Saved master object to {output_path}")
@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+DEFAULT_CACHE_DIR = os.environ.get("PMLA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".pmla_cache"))
+DEFAULT_MAX_BYTES = int(os.environ.get("PMLA_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+MANIFEST = "manifest.json"
+CACHE_VERSION = 5 # bump when process_data's output changes
+STALE_TMP_SECONDS = 3600 # .tmp- directories older than this are left over from a failed write
+
+# Arrow strings stay Arrow-backed in pandas, so a memory-mapped read does not copy them
+SHARED_TYPES = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}
+
+def content_hash(data):
+    """Cache key of an uploaded workbook: a hash of its bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def arrow_safe_frame(df):
+    """
+    Normalizes a frame so it round-trips through Arrow unchanged: column names
+    become unique strings and object columns Arrow cannot type (mixed cells)
+    are rendered as text, exactly as the dashboard's astype(str) would show them.
+    """
+    out = {}
+    for i, col in enumerate(df.columns):
+        name = str(col)
+        base, n = name, 0
+        while name in out:
+            n += 1
+            name = f"{base}.{n}"
+        values = df.iloc[:, i]
+        if values.dtype == object:
+            try:
+                pa.array(values, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                values = values.map(lambda v: v if pd.isna(v) else str(v))
+        out[name] = values
+    safe = pd.DataFrame(out, index=df.index).reset_index(drop=True)
+    safe.attrs = dict(df.attrs)
+    return safe
+
+class WorkbookCache:
+    """
+    Disk-backed cache of processed workbooks, shared by every process that
+    points at the same directory and surviving restarts.
+
+    Each entry is a directory named by the upload's content hash holding the
+    main frame in uncompressed Arrow IPC (Feather v2) format plus a manifest.
+    Other sheets are added to the entry one file at a time as they are first
+    parsed. Entries are published with an atomic rename and sheet files with an
+    atomic replace, so concurrent writers never expose partial data. Reads touch
+    the manifest, and the least recently used entries are evicted once the
+    directory grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry(self, key):
+        return os.path.join(self.cache_dir, f"v{CACHE_VERSION}-{key}")
+
+    def _sheet_file(self, key, sheet_name):
+        digest = hashlib.blake2b(sheet_name.encode("utf-8"), digest_size=8).hexdigest()
+        return os.path.join(self._entry(key), f"sheet_{digest}.arrow")
+
+    def get(self, key, shared=False):
+        """
+        The main frame for `key`, or None on a miss or unreadable entry.
+        With `shared`, columns are left as views of the memory-mapped file where
+        Arrow allows it (strings as Arrow-backed StringDtype, null-free numbers
+        as read-only arrays), so one copy in the OS page cache serves every reader.
+        """
+        entry = self._entry(key)
+        manifest_path = os.path.join(entry, MANIFEST)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            table = feather.read_table(os.path.join(entry, manifest["main"]), memory_map=True)
+            if shared:
+                df = table.to_pandas(split_blocks=True, types_mapper=SHARED_TYPES.get)
+            else:
+                df = table.to_pandas()
+            df.attrs.update(manifest.get("attrs", {}))
+            os.utime(manifest_path) # LRU: mark as recently used
+            return df
+        except (OSError, ValueError, KeyError, pa.ArrowException):
+            return None
+
+    def put(self, key, df):
+        """
+        Stores a processed main frame and returns it exactly as a later get()
+        will read it back, so hits and misses hand out identical data.
+        """
+        df = arrow_safe_frame(df)
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            return df
+
+        tmp = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(tmp)
+            feather.write_feather(df, os.path.join(tmp, "main.arrow"), compression="uncompressed")
+            manifest = {"main": "main.arrow", "attrs": df.attrs, "created": time.time()}
+            with open(os.path.join(tmp, MANIFEST), "w") as f:
+                json.dump(manifest, f)
+            try:
+                os.rename(tmp, entry)
+            except OSError:
+                pass # another process published the same upload first
+            self._evict()
+        except (OSError, pa.ArrowException) as e:
+            print(f"Warning: workbook cache write failed: {e}")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return df
+
+    def get_sheet(self, key, sheet_name):
+        """A raw sheet of the workbook cached under `key`, or None if it was never stored."""
+        try:
+            frame = feather.read_table(self._sheet_file(key, sheet_name), memory_map=True).to_pandas()
+            os.utime(os.path.join(self._entry(key), MANIFEST))
+            return frame
+        except (OSError, pa.ArrowException):
+            return None
+
+    def put_sheet(self, key, sheet_name, frame):
+        """
+        Adds one raw sheet to an existing entry and returns it as get_sheet() will
+        read it back. Sheets of uncached workbooks are not stored.
+        """
+        frame = arrow_safe_frame(frame)
+        if not os.path.isdir(self._entry(key)):
+            return frame
+
+        path = self._sheet_file(key, sheet_name)
+        tmp = f"{path}.tmp-{uuid.uuid4().hex}"
+        try:
+            feather.write_feather(frame, tmp, compression="uncompressed")
+            os.replace(tmp, path)
+            self._evict()
+        except (OSError, pa.ArrowException) as e:
+            print(f"Warning: sheet cache write failed: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return frame
+
+    def _evict(self):
+        """
+        Deletes least recently used entries until the cache fits `max_bytes`.
+        Directories without a manifest (a crash mid-write, a half-finished
+        eviction) count as the oldest entries and always go; .tmp- directories
+        only once they are too old to be a write in progress.
+        """
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or not (name.startswith(".tmp-") or re.match(r"v\d+-", name)):
+                continue
+            try:
+                if name.startswith(".tmp-"):
+                    if now - os.path.getmtime(path) < STALE_TMP_SECONDS:
+                        continue
+                    used = None
+                else:
+                    try:
+                        used = os.path.getmtime(os.path.join(path, MANIFEST))
+                    except FileNotFoundError:
+                        used = None
+                size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+            except OSError:
+                continue # removed by another process meanwhile
+            if used is None:
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                entries.append((used, size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
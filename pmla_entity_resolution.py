@@ -0,0 +1,251 @@
+import re
+import hashlib
+from collections import defaultdict, Counter
+from itertools import chain
+import numpy as np
+
+# Tokens dropped from names before matching
+HONORIFICS = {
+    "shri", "sh", "sri", "smt", "shrimati", "sushri", "kumari", "km", "mr", "mrs", "ms",
+    "miss", "dr", "late", "m/s", "adv", "er", "prof", "capt", "col", "retd",
+}
+# Relation markers: everything after them describes a relative, not the person
+RELATION_RE = re.compile(r"\b(?:s/o|d/o|w/o|c/o|son of|daughter of|wife of)\b.*$")
+MATCH_THRESHOLD = 0.92 # surname similarity needed to merge names with identical given names
+MAX_BLOCK = 200      # larger blocks are compared within a sorted window only
+WINDOW = 20
+SCORE_BATCH = 50000  # candidate pairs scored per array pass
+
+def normalize_name(name):
+    """'Shri. Ram  Kumar S/o Shyam' -> 'ram kumar'. Returns '' for non-names."""
+    if name is None:
+        return ""
+    text = str(name).lower()
+    text = text.split("@")[0]                      # 'X @ alias' -> 'X'
+    text = RELATION_RE.sub("", text)
+    text = text.replace("m/s", " m/s ")
+    tokens = re.sub(r"[^a-z/ ]+", " ", text).split()
+    tokens = [t.strip("/") for t in tokens if t not in HONORIFICS]
+    tokens = [t for t in tokens if t and t not in HONORIFICS]
+    if not tokens or tokens == ["nan"]:
+        return ""
+    return " ".join(tokens)
+
+def soundex(token):
+    codes = {c: d for d, letters in
+             (("1", "bfpv"), ("2", "cgjkqsxz"), ("3", "dt"), ("4", "l"), ("5", "mn"), ("6", "r"))
+             for c in letters}
+    out, last = token[0].upper(), codes.get(token[0], "")
+    for c in token[1:]:
+        code = codes.get(c, "")
+        if code and code != last:
+            out += code
+        if c not in "hw":
+            last = code
+    return (out + "000")[:4]
+
+def blocking_keys(normalized):
+    """
+    ('tok', sorted tokens): the same tokens in any order, merged without scoring.
+    ('pho', given names + Soundex of the surname): candidates for a surname
+    misspelling. Given names must match token for token, so only names of two
+    or more tokens get this key ('rakesh kumar' never meets 'rajesh kumar').
+    """
+    tokens = normalized.split()
+    keys = [("tok", " ".join(sorted(tokens)))]
+    if len(tokens) > 1:
+        keys.append(("pho", " ".join(tokens[:-1]) + "|" + soundex(tokens[-1])))
+    return keys
+
+def jaro_winkler(a, b):
+    if a == b:
+        return 1.0
+    la, lb = len(a), len(b)
+    if not la or not lb:
+        return 0.0
+    window = max(la, lb) // 2 - 1
+    a_hits, b_hits = [False] * la, [False] * lb
+    matches = 0
+    for i, ca in enumerate(a):
+        for j in range(max(0, i - window), min(lb, i + window + 1)):
+            if not b_hits[j] and b[j] == ca:
+                a_hits[i] = b_hits[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    a_m = [c for c, h in zip(a, a_hits) if h]
+    b_m = [c for c, h in zip(b, b_hits) if h]
+    transpositions = sum(x != y for x, y in zip(a_m, b_m)) / 2
+    jaro = (matches / la + matches / lb + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for x, y in zip(a, b):
+        if x != y or prefix == 4:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+def _char_codes(words, width):
+    codes = np.full((len(words), width), -1, dtype=np.int32)
+    for k, w in enumerate(words):
+        codes[k, :len(w)] = [ord(c) for c in w]
+    return codes
+
+def jaro_winkler_batch(a, b):
+    """
+    jaro_winkler over two aligned lists of strings, computed as arrays: one
+    vectorized pass per character position instead of a Python loop per pair.
+    """
+    n = len(a)
+    if not n:
+        return np.zeros(0)
+    width = max(1, max(map(len, a)), max(map(len, b)))
+    A, B = _char_codes(a, width), _char_codes(b, width)
+    la = np.array([len(w) for w in a])
+    lb = np.array([len(w) for w in b])
+    window = (np.maximum(la, lb) // 2 - 1)[:, None]
+    cols = np.arange(width)
+
+    # Greedy matching as in jaro_winkler: each a-char takes the first free equal b-char in its window
+    a_hit = np.zeros((n, width), dtype=bool)
+    b_hit = np.zeros((n, width), dtype=bool)
+    for i in range(width):
+        ok = (B == A[:, i:i + 1]) & (A[:, i:i + 1] >= 0) & ~b_hit & (np.abs(cols - i) <= window)
+        rows = np.nonzero(ok.any(axis=1))[0]
+        a_hit[rows, i] = True
+        b_hit[rows, ok[rows].argmax(axis=1)] = True
+    matches = a_hit.sum(axis=1)
+
+    # Matched characters of each side in order; half the mismatches are transpositions
+    a_m = np.take_along_axis(A, np.argsort(~a_hit, axis=1, kind="stable"), axis=1)
+    b_m = np.take_along_axis(B, np.argsort(~b_hit, axis=1, kind="stable"), axis=1)
+    transpositions = ((a_m != b_m) & (cols < matches[:, None])).sum(axis=1) / 2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jaro = (matches / la + matches / lb + (matches - transpositions) / matches) / 3
+    jaro = np.where(matches > 0, jaro, 0.0)
+    prefix = np.cumprod((A[:, :4] == B[:, :4]) & (A[:, :4] >= 0), axis=1).sum(axis=1)
+    scores = jaro + prefix * 0.1 * (1 - jaro)
+    scores[np.array([x == y for x, y in zip(a, b)])] = 1.0
+    return scores
+
+def _candidate_pairs(members, surnames):
+    """A phonetic block's pairs: all of them, or a window over the surname order for oversized blocks."""
+    members = sorted(members, key=lambda i: surnames[i])
+    for pos, i in enumerate(members):
+        stop = len(members) if len(members) <= MAX_BLOCK else min(len(members), pos + 1 + WINDOW)
+        for j in members[pos + 1:stop]:
+            yield i, j
+
+def person_id(canonical):
+    return "P" + hashlib.blake2b(canonical.encode("utf-8"), digest_size=5).hexdigest()
+
+def resolve_persons(cases, known_ids=None):
+    """
+    Entity resolution over every case's persons_involved.
+
+    Names are normalized and grouped into blocks (see blocking_keys); only
+    names sharing a block are compared, so the work stays near-linear in the
+    number of distinct names. Within a phonetic block the given names already
+    agree token for token and the surnames are scored with Jaro-Winkler, all
+    candidate pairs in batched array passes.
+
+    A cluster keeps the person ID its names already had, from the cases' own
+    `person_ids` (e.g. restored from the case store) or `known_ids` (raw name
+    -> ID), so adding a spelling to a cluster does not change its ID. Clusters
+    with no earlier ID get one hashed from their canonical (smallest) form.
+    Every case's `person_ids` is refilled with raw name -> person ID.
+
+    Returns {person_id: {"name", "aliases", "cases"}}.
+    """
+    normalized = {}
+    for case in cases.values():
+        for raw in case.persons_involved:
+            if raw not in normalized:
+                normalized[raw] = normalize_name(raw)
+
+    names = sorted({n for n in normalized.values() if n})
+    index = {n: i for i, n in enumerate(names)}
+    sort_keys = [blocking_keys(n)[0][1] for n in names]
+    surnames = [n.rsplit(" ", 1)[-1] for n in names]
+    uf = _UnionFind(len(names))
+
+    blocks = defaultdict(list)
+    for i, n in enumerate(names):
+        for key in blocking_keys(n):
+            blocks[key].append(i)
+    pairs = []
+    for (kind, _), members in blocks.items():
+        if len(members) < 2:
+            continue
+        if kind == "tok":
+            # Same tokens in a different order: same person, no scoring needed
+            for j in members[1:]:
+                uf.union(members[0], j)
+        else:
+            pairs.extend(_candidate_pairs(members, surnames))
+    for start in range(0, len(pairs), SCORE_BATCH):
+        batch = pairs[start:start + SCORE_BATCH]
+        scores = jaro_winkler_batch([surnames[i] for i, _ in batch], [surnames[j] for _, j in batch])
+        for k in np.nonzero(scores >= MATCH_THRESHOLD)[0]:
+            uf.union(*batch[k])
+
+    # IDs the names were given before, per normalized name
+    prior = defaultdict(Counter)
+    earlier = [(raw, pid) for case in cases.values() for raw, pid in case.person_ids.items()]
+    for raw, pid in chain(earlier, (known_ids or {}).items()):
+        n = normalized.get(raw) or normalize_name(raw)
+        if n in index and pid:
+            prior[index[n]][pid] += 1
+
+    clusters = defaultdict(list)
+    for i in range(len(names)):
+        clusters[uf.find(i)].append(i)
+    ids, taken = {}, set()
+    for members in sorted(clusters.values(), key=lambda m: min(sort_keys[i] for i in m)):
+        votes = Counter()
+        for i in members:
+            votes.update(prior[i])
+        # The most used earlier ID (ties: smallest) that no other cluster has claimed
+        earlier_ids = [pid for pid, _ in sorted(votes.items(), key=lambda kv: (-kv[1], kv[0])) if pid not in taken]
+        pid = earlier_ids[0] if earlier_ids else person_id(min(sort_keys[i] for i in members))
+        taken.add(pid)
+        for i in members:
+            ids[i] = pid
+
+    persons = {}
+    spellings = defaultdict(Counter)
+    for ecir, case in cases.items():
+        case.person_ids = {}
+        for raw in case.persons_involved:
+            n = normalized[raw]
+            if not n:
+                continue
+            pid = ids[index[n]]
+            case.person_ids[raw] = pid
+            entry = persons.setdefault(pid, {"name": None, "aliases": set(), "cases": []})
+            entry["aliases"].add(str(raw))
+            if not entry["cases"] or entry["cases"][-1] != ecir:
+                entry["cases"].append(ecir)
+            spellings[pid][str(raw)] += 1
+
+    for pid, entry in persons.items():
+        # Display name: the most frequent spelling (ties broken alphabetically)
+        entry["name"] = min(spellings[pid].items(), key=lambda kv: (-kv[1], kv[0]))[0]
+        entry["aliases"] = sorted(entry["aliases"])
+    return persons
@@ -2,42 +2,40 @@
 import json
 import argparse
 import sys
+import os
 from datetime import datetime
+from pmla_case_store import load_cases, DEFAULT_STORE_PATH
+from pmla_search_index import load_index
+from pmla_graph import CaseGraph
 
 DATA_PATH = r"c:\Users\HP\Downloads\EDOTS PMLA data\master_cases.json"
 
 class PMLAExplorer:
-    def __init__(self):
+    def __init__(self, store_path=DEFAULT_STORE_PATH, index_path=None):
         self.cases = {}
+        self.index = None
+        self.graph = None # co-accused graph, built on first use
+        self.store_path = store_path
         self.load_data()
+        self.index = load_index(self.cases, index_path, store_path) # default: next to the store
 
     def load_data(self):
+        # Prefer the columnar case store; fall back to a legacy JSON dump
+        if os.path.isdir(self.store_path):
+            self.cases = load_cases(self.store_path)
+            print(f"Loaded {len(self.cases)} cases.")
+            return
         try:
             with open(DATA_PATH, "r") as f:
                 self.cases = json.load(f)
             print(f"Loaded {len(self.cases)} cases.")
         except FileNotFoundError:
-            print("Error: master_cases.json not found. Run pmla_data_ingestor.py first.")
+            print("Error: case store not found. Run pmla_data_ingestor.py first.")
             sys.exit(1)
 
     def search(self, query):
-        query = query.lower()
-        results = []
-        for ecir, data in self.cases.items():
-            match = False
-            # Search logic
-            if query in ecir.lower(): match = True
-            
-            # Search persons
-            for p in data.get("persons_involved", []):
-                if query in str(p).lower(): match = True
-                
-            # Search searches/arrests
-            # (Can expand this)
-            
-            if match:
-                results.append(data)
-        return results
+        # Ranked hits over ECIR, person names and search locations
+        return [self.cases[ecir] for ecir in self.index.query(query)]
 
     def print_case(self, case_data):
         print(f"\n{'='*60}")
@@ -82,13 +80,46 @@ class PMLAExplorer:
             print("  (None recorded)")
         print(f"{'='*60}\n")
 
+    def print_links(self, ecir, hops=1, min_shared=1):
+        if self.graph is None:
+            self.graph = CaseGraph.from_cases(self.cases)
+        if ecir not in self.graph.case_pos:
+            print(f"Unknown ECIR: {ecir}")
+            return
+        shared = self.graph.shared_accused(ecir, min_shared)
+        near = self.graph.neighbourhood(ecir, hops)
+        network = self.graph.component_of(ecir)
+
+        print(f"\n{'='*60}")
+        print(f"CO-ACCUSED LINKS FOR {ecir}")
+        print(f"{'='*60}")
+        print(f"  Network size : {len(network)} cases")
+        print(f"  Within {hops} hop(s): {len(near)} cases")
+        print(f"\n--- CASES SHARING >= {min_shared} ACCUSED ---")
+        if shared:
+            for other, n in list(shared.items())[:20]:
+                print(f"  - {other} ({n} shared)")
+            if len(shared) > 20: print(" ... and more")
+        else:
+            print("  (None recorded)")
+        print(f"{'='*60}\n")
+
     def run(self):
         while True:
             try:
-                q = input("\nEnter ECIR, Name, or 'exit': ").strip()
+                q = input("\nEnter ECIR, Name, 'links <ECIR> [hops] [min shared]', or 'exit': ").strip()
                 if q.lower() in ['exit', 'quit']:
                     break
                 if not q: continue
+
+                # Graph command: links <ECIR> [hops] [min shared]
+                if q.lower().startswith("links "):
+                    parts = q.split()[1:]
+                    nums = []
+                    while parts and parts[-1].isdigit() and len(nums) < 2:
+                        nums.insert(0, int(parts.pop()))
+                    self.print_links(" ".join(parts), *nums)
+                    continue
                 
                 results = self.search(q)
                 print(f"Found {len(results)} matches.")
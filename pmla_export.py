@@ -0,0 +1,125 @@
+import io
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from pmla_data_ingestor import (
+    detect_header_row, clean_column_name, sheet_category, sheet_roles, normalize_ecir, HEADER_SCAN_ROWS,
+)
+from pmla_disk_cache import arrow_safe_frame
+from pmla_schema import SCHEMAS
+
+CHUNK_ROWS = 10000
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel (with linked sheets)": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+LINKED_CATEGORIES = ["search", "arrest", "pao", "pc"]
+XLSX_SHEET_NAME_MAX = 31
+
+def _chunks(df, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def iter_csv(df, chunk_rows=CHUNK_ROWS):
+    """The frame as UTF-8 CSV, `chunk_rows` rows at a time (header in the first chunk)."""
+    if df.empty:
+        yield df.to_csv(index=False).encode("utf-8")
+        return
+    for i, chunk in enumerate(_chunks(df, chunk_rows)):
+        yield chunk.to_csv(index=False, header=(i == 0)).encode("utf-8")
+
+def write_csv(df, out, chunk_rows=CHUNK_ROWS):
+    for block in iter_csv(df, chunk_rows):
+        out.write(block)
+
+def write_parquet(df, out, chunk_rows=CHUNK_ROWS):
+    """One row group per chunk, so only a chunk is ever converted to Arrow at a time."""
+    df = arrow_safe_frame(df)
+    schema = pa.Schema.from_pandas(df, preserve_index=False) # types inferred over all rows
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for chunk in _chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+def _xlsx_cell(val):
+    if val is None or (not isinstance(val, (list, tuple)) and pd.isna(val)):
+        return None
+    if isinstance(val, pd.Timestamp):
+        return val.to_pydatetime()
+    if hasattr(val, "item"): # numpy scalars
+        return val.item()
+    return val if isinstance(val, (int, float, str)) else str(val)
+
+def _append_frame(ws, df, chunk_rows=CHUNK_ROWS):
+    ws.append([str(c) for c in df.columns])
+    for chunk in _chunks(df, chunk_rows):
+        for row in chunk.itertuples(index=False, name=None):
+            ws.append([_xlsx_cell(v) for v in row])
+
+def write_xlsx(df, out, linked=None, chunk_rows=CHUNK_ROWS):
+    """
+    Multi-sheet workbook: 'Filtered Cases' then one sheet per entry of `linked`
+    ({sheet name: frame}). Written in openpyxl's write-only mode, which streams
+    rows to disk instead of building the workbook in memory.
+    """
+    wb = Workbook(write_only=True)
+    _append_frame(wb.create_sheet("Filtered Cases"), df, chunk_rows)
+    for name, frame in (linked or {}).items():
+        _append_frame(wb.create_sheet(name[:XLSX_SHEET_NAME_MAX]), frame, chunk_rows)
+    wb.save(out)
+
+def with_detected_header(frame):
+    """
+    A sheet parsed with header=0 re-headed on the row detect_header_row picks,
+    for sheets whose real header sits below a title block. Sheets where no
+    header is detected keep their parsed header.
+    """
+    rows = [list(frame.columns)] + frame.head(HEADER_SCAN_ROWS - 1).values.tolist()
+    header_idx = SCHEMAS.header_row("export_sheet", rows, detect_header_row)[0]
+    if header_idx > 0:
+        frame = frame.iloc[header_idx:].reset_index(drop=True).set_axis(rows[header_idx], axis=1)
+    # set_axis returns a new frame: the workbook's cached sheet is shared and must not change
+    return frame.set_axis([clean_column_name(c) for c in frame.columns], axis=1)
+
+def linked_rows(workbook, ecirs, categories=LINKED_CATEGORIES):
+    """
+    {sheet name: rows} from the search/arrest/PAO/PC sheets of a LazyWorkbook
+    whose ECIR is in `ecirs`. Sheets without an ECIR column or matches are left out.
+    """
+    wanted = {normalize_ecir(e) for e in ecirs}
+    linked = {}
+    for sheet_name in workbook.sheet_names:
+        if sheet_category(sheet_name) not in categories:
+            continue
+        frame = with_detected_header(workbook.sheet(sheet_name))
+        ecir_col = sheet_roles(frame.columns)["ecir"]
+        if ecir_col is None:
+            continue
+        rows = frame[frame[ecir_col].map(normalize_ecir).isin(wanted)]
+        if not rows.empty:
+            linked[sheet_name] = rows
+    return linked
+
+def write_export(df, fmt, out, workbook=None, ecir_col=None):
+    """
+    Writes one export of `df` in `fmt` (a key of EXPORT_FORMATS) to the binary
+    file `out`. The Excel format adds the linked rows of `workbook` for the
+    ECIRs in `ecir_col`. The file is written chunk by chunk, so no whole-frame
+    CSV string or Arrow table is ever built.
+    """
+    ext = EXPORT_FORMATS[fmt][0]
+    if ext == "csv":
+        write_csv(df, out)
+    elif ext == "parquet":
+        write_parquet(df, out)
+    else:
+        linked = linked_rows(workbook, df[ecir_col].dropna()) if workbook is not None and ecir_col else None
+        write_xlsx(df, out, linked)
+
+def export_bytes(df, fmt, workbook=None, ecir_col=None):
+    """write_export into memory; returns a view of the buffer rather than a copy of it."""
+    out = io.BytesIO()
+    write_export(df, fmt, out, workbook, ecir_col)
+    return out.getbuffer()
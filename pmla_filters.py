@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from pmla_conversions import case_label, value_column_roles
+from pmla_schema import SCHEMAS
+
+STATUS_FILTERS = ["All Cases", "Arrests Made", "Attachment Done", "Prosecution Filed"]
+
+def find_io_column(columns):
+    # IO or Investigating Officer Column
+    return next((c for c in columns if ('io' in c.lower() or 'investigating' in c.lower() or 'officer' in c.lower()) and 'zonal' not in c.lower() and 'type' not in c.lower()), None)
+
+def find_pc_column(columns):
+    return next((c for c in columns if 'pc' in c.lower() and 'filed' in c.lower()), None)
+
+def resolve_filter_columns(columns):
+    return {"io": find_io_column(columns), "pc": find_pc_column(columns)}
+
+def filter_column_roles(columns):
+    """The IO and PC-filed columns, through the schema registry."""
+    return SCHEMAS.roles("filter_columns", columns, resolve_filter_columns)
+
+def contains_text(values, text):
+    """
+    Case-insensitive substring test over a column as a boolean array; for a
+    categorical only the categories are searched, not every row.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        hits = np.asarray(values.cat.categories.astype(str).str.contains(text, case=False, regex=False), dtype=bool)
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, hits[codes], False)
+    return values.astype(str).str.contains(text, case=False, na=False, regex=False).to_numpy()
+
+def _positions_by_value(values):
+    """{value: row positions} for every distinct value; the arrays partition the rows."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return {uniques[i]: order[bounds[i]:bounds[i + 1]] for i in range(len(uniques))}
+
+class FilterEngine:
+    """
+    Precomputed indexes behind the dashboard's global filters, built once per
+    processed workbook.
+
+    Year and IO hold row-position arrays per distinct value (together they
+    partition the rows, so memory stays O(rows)), the status filters are
+    boolean masks, and PoC_Value is kept sorted so the slider threshold is a
+    binary search. A widget change only combines these into one mask; the
+    frame itself is never copied or re-scanned.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        roles = filter_column_roles(df.columns)
+        self.io_col, self.pc_col = roles["io"], roles["pc"]
+
+        self.year_positions = _positions_by_value(df['Year'].to_numpy())
+        self.years = sorted((int(y) for y in self.year_positions if y > 0), reverse=True)
+
+        self.io_positions = {}
+        if self.io_col:
+            io = df[self.io_col]
+            if not isinstance(io.dtype, pd.CategoricalDtype): # categoricals factorize on their codes
+                io = io.astype(str).where(io.notna()).to_numpy(dtype=object)
+            self.io_positions = _positions_by_value(io)
+        self.io_values = sorted(self.io_positions)
+
+        self.status_masks = {
+            "Arrests Made": (df['Arrest_Count'] > 0).to_numpy(),
+            "Attachment Done": (df['PAO_Value'] > 0).to_numpy(),
+        }
+        if self.pc_col:
+            self.status_masks["Prosecution Filed"] = contains_text(df[self.pc_col], 'Yes')
+
+        poc = df['PoC_Value'].to_numpy(dtype=float)
+        order = np.argsort(poc, kind="stable")
+        self.poc_order = order[~np.isnan(poc[order])] # NaN never passes a >= test
+        self.poc_sorted = poc[self.poc_order]
+
+    def _select(self, positions, keys):
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for key in keys:
+            idx = positions.get(key)
+            if idx is not None:
+                mask[idx] = True
+        return mask
+
+    def mask(self, years=(), ios=(), min_poc=0, action="All Cases"):
+        """Boolean row mask for the sidebar selection (empty selections don't filter)."""
+        start = np.searchsorted(self.poc_sorted, min_poc, side="left")
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.poc_order[start:]] = True
+
+        if years:
+            mask &= self._select(self.year_positions, years)
+        if ios and self.io_col:
+            mask &= self._select(self.io_positions, ios)
+        if action in self.status_masks:
+            mask &= self.status_masks[action]
+        return mask
+
+class CaseIndex:
+    """
+    Case_ID -> row position over the processed main sheet, plus the column
+    roles the drill-down needs, built once per processed workbook so a case
+    selection is a dict lookup and an iloc instead of a column scan.
+    Dropdown labels are built from the case-name column when displayed.
+    """
+
+    def __init__(self, df):
+        roles = value_column_roles(df.columns)
+        self.ecir_col, name_col = roles['ecir'], roles['name']
+        self.pc_col = filter_column_roles(df.columns)["pc"]
+        ids = df['Case_ID'].tolist() if 'Case_ID' in df.columns else []
+        self.positions = dict(zip(ids, range(len(ids))))
+        self.names = df[name_col] if name_col and ids else None
+        self.ecirs = dict(zip(ids, df[self.ecir_col].astype(str).tolist())) if ids else {}
+
+    def __contains__(self, case_id):
+        return case_id in self.positions
+
+    def label(self, case_id):
+        pos = self.positions.get(case_id)
+        if pos is None:
+            return case_id
+        return case_label(case_id, None if self.names is None else self.names.iat[pos])
+
+    def row(self, df, case_id):
+        """The case's row of the frame the index was built from."""
+        return df.iloc[self.positions[case_id]]
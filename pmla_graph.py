@@ -0,0 +1,183 @@
+import numpy as np
+from pmla_entity_resolution import normalize_name
+
+def _case_persons(case):
+    """(person key, display name) pairs for a MasterCase or a case dict from the store."""
+    if isinstance(case, dict):
+        persons = case.get("persons_involved") or []
+        ids = case.get("person_ids") or {}
+    else:
+        persons = case.persons_involved
+        ids = getattr(case, "person_ids", {})
+    pairs = {}
+    for p in persons:
+        # Resolved person IDs when available, otherwise the normalized spelling
+        key = ids.get(p) or normalize_name(p)
+        if key and key not in pairs:
+            pairs[key] = str(p)
+    return pairs.items()
+
+def _csr(rows, cols, n_rows):
+    """(indptr, indices) adjacency of the edge list (rows[i] -> cols[i])."""
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32)
+
+class CaseGraph:
+    """
+    Bipartite person <-> case graph of co-accused links.
+
+    Both directions are kept as CSR arrays (indptr + indices), so a case's
+    persons or a person's cases are a contiguous slice, and multi-hop and
+    overlap queries are numpy gathers and bincounts rather than self-merges.
+    """
+
+    def __init__(self, ecirs, person_keys, person_names, case_ptr, case_persons, person_ptr, person_cases):
+        self.ecirs = ecirs
+        self.case_pos = {e: i for i, e in enumerate(ecirs)}
+        self.person_keys = person_keys
+        self.person_pos = {p: i for i, p in enumerate(person_keys)}
+        self.person_names = person_names
+        self.case_ptr, self.case_persons = case_ptr, case_persons
+        self.person_ptr, self.person_cases = person_ptr, person_cases
+        self._components = None
+
+    @classmethod
+    def from_cases(cls, cases):
+        """Builds the graph from {ecir: MasterCase} or {ecir: case dict}."""
+        ecirs = list(cases)
+        person_pos, person_keys, person_names = {}, [], []
+        rows, cols = [], []
+        for ci, ecir in enumerate(ecirs):
+            for key, name in _case_persons(cases[ecir]):
+                pi = person_pos.get(key)
+                if pi is None:
+                    pi = person_pos[key] = len(person_keys)
+                    person_keys.append(key)
+                    person_names.append(name)
+                rows.append(ci)
+                cols.append(pi)
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        case_ptr, case_persons = _csr(rows, cols, len(ecirs))
+        person_ptr, person_cases = _csr(cols, rows, len(person_keys))
+        return cls(ecirs, person_keys, person_names, case_ptr, case_persons, person_ptr, person_cases)
+
+    # --- Adjacency ---
+    def _persons_of(self, ci):
+        return self.case_persons[self.case_ptr[ci]:self.case_ptr[ci + 1]]
+
+    def _cases_of(self, pi):
+        return self.person_cases[self.person_ptr[pi]:self.person_ptr[pi + 1]]
+
+    def _gather(self, ptr, indices, items):
+        """Concatenated adjacency slices of `items` in one vectorized gather."""
+        if len(items) == 0:
+            return np.empty(0, dtype=indices.dtype)
+        starts, ends = ptr[items], ptr[items + 1]
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return indices[offsets + np.arange(lengths.sum())]
+
+    def persons_of(self, ecir):
+        ci = self.case_pos.get(ecir)
+        if ci is None:
+            return []
+        return [self.person_names[pi] for pi in self._persons_of(ci)]
+
+    def cases_of(self, person_key):
+        pi = self.person_pos.get(person_key)
+        if pi is None:
+            return []
+        return [self.ecirs[ci] for ci in self._cases_of(pi)]
+
+    # --- Queries ---
+    def neighbourhood(self, ecir, hops=1):
+        """
+        Cases reachable from `ecir` within `hops` case->person->case steps.
+        Returns {ecir: hop distance}, excluding the case itself.
+        """
+        ci = self.case_pos.get(ecir)
+        if ci is None:
+            return {}
+        dist = np.full(len(self.ecirs), -1, dtype=np.int32)
+        dist[ci] = 0
+        seen_persons = np.zeros(len(self.person_keys), dtype=bool)
+        frontier = np.array([ci], dtype=np.int64)
+        for hop in range(1, hops + 1):
+            persons = np.unique(self._gather(self.case_ptr, self.case_persons, frontier))
+            persons = persons[~seen_persons[persons]]
+            seen_persons[persons] = True
+            reached = np.unique(self._gather(self.person_ptr, self.person_cases, persons.astype(np.int64)))
+            frontier = reached[dist[reached] < 0].astype(np.int64)
+            if len(frontier) == 0:
+                break
+            dist[frontier] = hop
+        return {self.ecirs[i]: int(dist[i]) for i in np.nonzero(dist > 0)[0]}
+
+    def shared_accused(self, ecir, min_shared=1):
+        """Cases sharing at least `min_shared` persons with `ecir`, as {ecir: count}, most shared first."""
+        ci = self.case_pos.get(ecir)
+        if ci is None:
+            return {}
+        others = self._gather(self.person_ptr, self.person_cases, self._persons_of(ci).astype(np.int64))
+        counts = np.bincount(others, minlength=len(self.ecirs))
+        counts[ci] = 0
+        hits = np.nonzero(counts >= max(min_shared, 1))[0]
+        hits = hits[np.argsort(-counts[hits], kind="stable")]
+        return {self.ecirs[i]: int(counts[i]) for i in hits}
+
+    def pairs_sharing(self, min_shared=2, max_person_degree=None):
+        """
+        All case pairs sharing at least `min_shared` persons: [(ecir_a, ecir_b, count)].
+        Persons linked to more than `max_person_degree` cases (e.g. placeholder
+        names) can be skipped to keep hub fan-out bounded.
+        """
+        degree = np.diff(self.person_ptr)
+        usable = degree >= 2
+        if max_person_degree:
+            usable &= degree <= max_person_degree
+        pairs = []
+        for ci in range(len(self.ecirs)):
+            persons = self._persons_of(ci)
+            persons = persons[usable[persons]].astype(np.int64)
+            if len(persons) < min_shared:
+                continue
+            others = self._gather(self.person_ptr, self.person_cases, persons)
+            others = others[others > ci]
+            if len(others) == 0:
+                continue
+            found, counts = np.unique(others, return_counts=True)
+            for cj, n in zip(found[counts >= min_shared], counts[counts >= min_shared]):
+                pairs.append((self.ecirs[ci], self.ecirs[cj], int(n)))
+        return pairs
+
+    def components(self):
+        """Connected-component label per case (cases linked through any shared person)."""
+        if self._components is None:
+            labels = np.full(len(self.ecirs), -1, dtype=np.int64)
+            seen_persons = np.zeros(len(self.person_keys), dtype=bool)
+            label = 0
+            for start in range(len(self.ecirs)):
+                if labels[start] >= 0:
+                    continue
+                labels[start] = label
+                frontier = np.array([start], dtype=np.int64)
+                while len(frontier):
+                    persons = np.unique(self._gather(self.case_ptr, self.case_persons, frontier))
+                    persons = persons[~seen_persons[persons]]
+                    seen_persons[persons] = True
+                    reached = np.unique(self._gather(self.person_ptr, self.person_cases, persons.astype(np.int64)))
+                    frontier = reached[labels[reached] < 0].astype(np.int64)
+                    labels[frontier] = label
+                label += 1
+            self._components = labels
+        return self._components
+
+    def component_of(self, ecir):
+        ci = self.case_pos.get(ecir)
+        if ci is None:
+            return []
+        labels = self.components()
+        return [self.ecirs[i] for i in np.nonzero(labels == labels[ci])[0]]
@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from functools import wraps
+from contextlib import contextmanager
+
+try:
+    import psutil # optional: RSS on every platform
+except ImportError:
+    psutil = None
+
+METRICS_LOG = os.environ.get("PMLA_METRICS_LOG") # JSONL sink; unset = keep records in memory only
+SAMPLE_SECONDS = 0.05
+RECENT_RECORDS = 2000
+
+def rss_mb():
+    """Resident memory of this process in MB, or None where it cannot be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class Stage:
+    """One timed stage; callers add row counts and fields while it runs."""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.rows = 0
+        self.peak_mb = None
+
+    def add_rows(self, n):
+        self.rows += int(n)
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+class Recorder:
+    """
+    Collects stage records: the most recent ones in memory (for the dashboard's
+    diagnostics panel) and, when `log_path` is set, every one as a JSON line.
+    A background thread samples RSS while stages are open, so each record
+    carries the peak memory seen during it.
+    """
+
+    def __init__(self, log_path=METRICS_LOG, max_recent=RECENT_RECORDS):
+        self.log_path = log_path
+        self.recent = deque(maxlen=max_recent)
+        self._lock = threading.Lock()
+        self._active = set()
+        self._sampler = None
+
+    def _sample(self):
+        while True:
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                with self._lock:
+                    if not self._active:
+                        self._sampler = None
+                        return
+                continue
+            rss = rss_mb()
+            if rss is not None:
+                for s in active:
+                    s.peak_mb = rss if s.peak_mb is None else max(s.peak_mb, rss)
+            time.sleep(SAMPLE_SECONDS)
+
+    def _open(self, s):
+        with self._lock:
+            self._active.add(s)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True)
+                self._sampler.start()
+
+    def _close(self, s):
+        with self._lock:
+            self._active.discard(s)
+
+    def emit(self, record):
+        with self._lock:
+            self.recent.append(record)
+            if self.log_path:
+                try:
+                    with open(self.log_path, "a") as f:
+                        f.write(json.dumps(record, default=str) + "\n")
+                except OSError as e:
+                    print(f"Warning: could not write metrics log: {e}")
+
+    @contextmanager
+    def stage(self, name, **fields):
+        s = Stage(name, fields)
+        start_rss = rss_mb()
+        s.peak_mb = start_rss
+        self._open(s)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield s
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self._close(s)
+            end_rss = rss_mb()
+            if end_rss is not None:
+                s.peak_mb = end_rss if s.peak_mb is None else max(s.peak_mb, end_rss)
+            record = {
+                "ts": time.time(), "stage": name, "seconds": round(seconds, 6), "rows": s.rows,
+                "rss_start_mb": None if start_rss is None else round(start_rss, 1),
+                "peak_mb": None if s.peak_mb is None else round(s.peak_mb, 1),
+                "pid": os.getpid(), "thread": threading.current_thread().name, **s.fields,
+            }
+            if error:
+                record["error"] = error
+            self.emit(record)
+
+METRICS = Recorder()
+
+def stage(name, **fields):
+    """Context manager timing a stage: `with stage("sheet_parse", sheet=name) as s: ...; s.add_rows(n)`."""
+    return METRICS.stage(name, **fields)
+
+def timed(name=None, **fields):
+    """Decorator form of stage(); the stage is named after the function unless `name` is given."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with METRICS.stage(name or fn.__name__, **fields):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def recent_records(n=None):
+    with METRICS._lock:
+        records = list(METRICS.recent)
+    return records if n is None else records[-n:]
@@ -0,0 +1,184 @@
+import os
+import re
+import json
+import time
+import base64
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from pmla_disk_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_LLM_CACHE_PATH = os.path.join(DEFAULT_CACHE_DIR, "llm_responses.sqlite")
+DEFAULT_TTL_SECONDS = int(os.environ.get("PMLA_LLM_CACHE_TTL", 24 * 3600))
+DEFAULT_MAX_BYTES = int(os.environ.get("PMLA_LLM_CACHE_MAX_BYTES", 256 * 1024 ** 2))
+
+def normalize_prompt(prompt):
+    """Prompts that differ only in case or whitespace share a cache entry."""
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+def request_key(model, prompt, data_fingerprint):
+    raw = json.dumps([model, normalize_prompt(prompt), data_fingerprint])
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+def response_parts(response):
+    """
+    Plain [{"kind": "text" | "image", "data": str | bytes}] view of a
+    generate_content response, the form responses are cached and rendered in.
+    """
+    parts = []
+    for part in getattr(response, "parts", None) or []:
+        inline = getattr(part, "inline_data", None)
+        if inline:
+            data = inline.data
+            if isinstance(data, str): # Base64 string in some SDK versions
+                data = base64.b64decode(data)
+            parts.append({"kind": "image", "data": data})
+        elif getattr(part, "text", None):
+            parts.append({"kind": "text", "data": part.text})
+    if not parts and getattr(response, "text", None):
+        parts.append({"kind": "text", "data": response.text})
+    return parts
+
+def _encode(parts):
+    return json.dumps([
+        {"kind": p["kind"], "data": base64.b64encode(p["data"]).decode("ascii") if p["kind"] == "image" else p["data"]}
+        for p in parts
+    ]).encode("utf-8")
+
+def _decode(payload):
+    return [
+        {"kind": p["kind"], "data": base64.b64decode(p["data"]) if p["kind"] == "image" else p["data"]}
+        for p in json.loads(payload)
+    ]
+
+class RequestCancelled(Exception):
+    """Raised by a model call its own session stopped; see ResponseCache.fetch."""
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.parts = None
+        self.error = None
+        self.cancelled = False
+
+class ResponseCache:
+    """
+    Gemini responses persisted in SQLite, keyed by model, normalized prompt
+    and a fingerprint of the data behind the prompt.
+
+    Entries expire after `ttl` seconds, and the least recently used ones are
+    dropped once payloads exceed `max_bytes`. Identical requests issued while
+    one is already running (e.g. from other sessions) wait for that call
+    instead of sending their own.
+    """
+
+    def __init__(self, path=DEFAULT_LLM_CACHE_PATH, ttl=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, created REAL, used REAL, size INTEGER, payload BLOB)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db: # commit on success, roll back on error
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key):
+        """Cached parts for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT payload FROM responses WHERE key = ? AND created > ?", (key, now - self.ttl)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+        return _decode(row[0])
+
+    def put(self, key, model, parts):
+        payload = _encode(parts)
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, now, now, len(payload), payload),
+            )
+            self._evict(db, now)
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY used").fetchall():
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def fetch(self, key, model, call):
+        """
+        Parts for `key`: from the cache, from an identical call already in
+        flight, or by running `call()` (which returns parts) and storing the result.
+        Returns (parts, source) with source 'cache', 'shared' or 'model'.
+
+        A call that fails is reported to everyone waiting on it. A call its own
+        session cancels (RequestCancelled, or a script-control exception such as
+        a Streamlit rerun) is only released: the waiters retry and one of them
+        takes the call over.
+        """
+        while True:
+            parts = self.get(key)
+            if parts is not None:
+                return parts, "cache"
+
+            with self._lock:
+                pending = self._in_flight.get(key)
+                owner = pending is None
+                if owner:
+                    pending = self._in_flight[key] = _InFlight()
+
+            if not owner:
+                pending.done.wait()
+                if pending.cancelled:
+                    continue
+                if pending.error is not None:
+                    raise pending.error
+                return pending.parts, "shared"
+
+            try:
+                cached = self.get(key) # an identical call may have finished since the first check
+                if cached is not None:
+                    pending.parts = cached
+                    return cached, "cache"
+                pending.parts = call()
+                if pending.parts:
+                    self.put(key, model, pending.parts)
+                return pending.parts, "model"
+            except BaseException as e:
+                if isinstance(e, Exception) and not isinstance(e, RequestCancelled):
+                    pending.error = e
+                else:
+                    pending.cancelled = True
+                raise
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                pending.done.set()
+
+    def generate(self, client, model, prompt, data_fingerprint):
+        """Cached client.models.generate_content(model=model, contents=prompt) as parts."""
+        key = request_key(model, prompt, data_fingerprint)
+        return self.fetch(key, model, lambda: response_parts(client.models.generate_content(model=model, contents=prompt)))
@@ -0,0 +1,95 @@
+import os
+import pandas as pd
+
+from pmla_filters import contains_text
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("PMLA_LLM_TOKEN_BUDGET", 8000))
+CHARS_PER_TOKEN = 4 # rough average for English/numeric text
+TOP_GAP_CASES = 20
+SAMPLE_ROWS = 50
+TOP_IOS = 15
+VALUE_COLS = ['PoC_Value', 'PAO_Value', 'Arrest_Count', 'Search_Count']
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def _table(df):
+    return df.round(2).to_csv(index=False).strip()
+
+def _summary(df, by):
+    grouped = df.groupby(by, sort=False, observed=True) # categoricals: only values present
+    out = grouped[VALUE_COLS].sum()
+    out.insert(0, 'Cases', grouped.size())
+    return out.reset_index()
+
+def _status_counts(df, pc_col):
+    rows = [
+        ("All Cases", len(df)),
+        ("Arrests Made", int((df['Arrest_Count'] > 0).sum())),
+        ("Attachment Done", int((df['PAO_Value'] > 0).sum())),
+    ]
+    if pc_col:
+        rows.append(("Prosecution Filed", int(contains_text(df[pc_col], 'Yes').sum())))
+    return pd.DataFrame(rows, columns=['Status', 'Cases'])
+
+def _fit_rows(title, table, budget_chars):
+    """The section with as many leading rows of `table` as fit in `budget_chars`; None if not even one."""
+    lo, hi, best = 1, len(table), None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        text = f"## {title}\n{_table(table.head(mid))}"
+        if len(text) <= budget_chars:
+            best, lo = (text, mid), mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+def build_context(df, ecir_col=None, name_col=None, io_col=None, pc_col=None, budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Compact, token-budgeted description of the filtered cases for the analysis
+    prompt. Sections are added in priority order (totals, status, year, IO,
+    top PoC gaps, a column-pruned sample) and each table is cut to the rows
+    that still fit. Returns (context text, report) where report holds the
+    estimated tokens and the rows kept per section.
+    """
+    budget_chars = budget * CHARS_PER_TOKEN
+    totals = df[VALUE_COLS].sum()
+    overview = (
+        f"## Overview\nCases: {len(df)} | Total PoC: {totals['PoC_Value']:,.2f} Cr | "
+        f"Total PAO: {totals['PAO_Value']:,.2f} Cr | Arrests: {int(totals['Arrest_Count'])} | "
+        f"Searches: {int(totals['Search_Count'])}"
+    )
+
+    case_cols = [c for c in [ecir_col, name_col, io_col, 'Year', *VALUE_COLS, pc_col] if c and c in df.columns]
+    gaps = df.assign(PoC_Gap=df['PoC_Value'] - df['PAO_Value'])
+    sections = [
+        ("Cases by Status", _status_counts(df, pc_col)),
+        ("Cases by Year", _summary(df, 'Year').sort_values('Year', ascending=False)),
+    ]
+    if io_col:
+        sections.append(("Top IOs by PoC", _summary(df, io_col).nlargest(TOP_IOS, 'PoC_Value')))
+    sections += [
+        ("Top Cases by Unattached PoC Gap (Cr)", gaps.nlargest(TOP_GAP_CASES, 'PoC_Gap')[case_cols + ['PoC_Gap']]),
+        ("Sample Cases", df[case_cols].sample(min(SAMPLE_ROWS, len(df)), random_state=0)),
+    ]
+
+    parts = [overview]
+    report = {"budget": budget, "sections": {"Overview": 1}, "truncated": []}
+    used = len(overview)
+    for title, table in sections:
+        if table.empty:
+            continue
+        fitted = _fit_rows(title, table, budget_chars - used - 2)
+        if fitted is None:
+            report["truncated"].append(title)
+            continue
+        text, rows = fitted
+        parts.append(text)
+        used += len(text) + 2
+        report["sections"][title] = rows
+        if rows < len(table):
+            report["truncated"].append(title)
+
+    context = "\n\n".join(parts)
+    report["tokens"] = estimate_tokens(context)
+    return context, report
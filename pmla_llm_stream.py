@@ -0,0 +1,96 @@
+import os
+import time
+import queue
+import threading
+
+from pmla_llm_cache import response_parts, RequestCancelled
+
+MAX_CONCURRENT_CALLS = int(os.environ.get("PMLA_LLM_MAX_CONCURRENT", 4))
+DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("PMLA_LLM_TIMEOUT", 120))
+POLL_SECONDS = 0.1
+
+# Shared by every session in the server process
+_CALL_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_CALLS)
+_DONE = object()
+
+class StreamCancelled(RequestCancelled):
+    pass
+
+class StreamingCall:
+    """
+    One client.models.generate_content_stream call run on a worker thread.
+
+    At most MAX_CONCURRENT_CALLS run at once across all sessions; a call that
+    cannot get a slot, or that runs past `timeout` seconds in total, fails with
+    TimeoutError. Chunks are handed to the consuming thread through a queue as
+    parts ({"kind": "text" | "image", "data": ...}); cancel() stops the worker
+    at the next chunk.
+    """
+
+    def __init__(self, client, model, prompt, timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.model = model
+        self.deadline = time.monotonic() + timeout
+        self.cancelled = threading.Event()
+        self.parts = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, args=(client, prompt), daemon=True)
+        self._thread.start()
+
+    def _run(self, client, prompt):
+        if not _CALL_SLOTS.acquire(timeout=max(self.deadline - time.monotonic(), 0)):
+            self._queue.put(TimeoutError("All model slots are busy; try again shortly."))
+            return
+        try:
+            if self.cancelled.is_set():
+                return
+            for chunk in client.models.generate_content_stream(model=self.model, contents=prompt):
+                if self.cancelled.is_set():
+                    break
+                if time.monotonic() > self.deadline:
+                    raise TimeoutError("The model did not finish in time.")
+                for part in response_parts(chunk):
+                    self._queue.put(part)
+        except Exception as e:
+            self._queue.put(e)
+        finally:
+            _CALL_SLOTS.release()
+            self._queue.put(_DONE)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def stream(self, heartbeat=False):
+        """
+        Yields parts as they arrive and records them in self.parts (adjacent
+        text merged). With `heartbeat`, also yields None every POLL_SECONDS
+        while waiting, so the consumer gets a chance to react (e.g. to a rerun).
+        Raises TimeoutError past the deadline and StreamCancelled after
+        cancel(). Closing the generator early cancels the call.
+        """
+        finished = False
+        try:
+            while True:
+                if self.cancelled.is_set():
+                    raise StreamCancelled("Generation stopped.")
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("The model did not finish in time.")
+                try:
+                    item = self._queue.get(timeout=min(POLL_SECONDS, remaining))
+                except queue.Empty:
+                    if heartbeat:
+                        yield None
+                    continue
+                if item is _DONE:
+                    finished = True
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                if item["kind"] == "text" and self.parts and self.parts[-1]["kind"] == "text":
+                    self.parts[-1] = {"kind": "text", "data": self.parts[-1]["data"] + item["data"]}
+                else:
+                    self.parts.append(item)
+                yield item
+        finally:
+            if not finished:
+                self.cancel()
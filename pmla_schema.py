@@ -0,0 +1,153 @@
+import os
+import json
+import uuid
+import inspect
+import hashlib
+import threading
+import pandas as pd
+
+from pmla_disk_cache import DEFAULT_CACHE_DIR
+
+# Persistent layout registry; set PMLA_SCHEMA_REGISTRY to "" to keep it in memory only
+DEFAULT_REGISTRY_PATH = os.environ.get("PMLA_SCHEMA_REGISTRY", os.path.join(DEFAULT_CACHE_DIR, "schema_registry.json"))
+REGISTRY_FORMAT = 2 # bump when the file layout changes; heuristic changes are versioned from their source
+
+def cell_text(value):
+    """A header cell as text: stripped, '' for blanks (None, NaN, empty strings)."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    return str(value).strip()
+
+def layout_signature(cells):
+    """
+    Hash of a header row or column list. Trailing blank cells are ignored, so a
+    row read by pandas and the same row read by openpyxl sign alike.
+    """
+    texts = [cell_text(v) for v in cells]
+    while texts and not texts[-1]:
+        texts.pop()
+    return hashlib.blake2b("\x1f".join(texts).encode("utf-8"), digest_size=16).hexdigest()
+
+_source_versions = {}
+
+def heuristic_version(fn):
+    """
+    Hash of the source of the module defining `fn`, so registered results are
+    dropped whenever the heuristic, or anything next to it, is edited. None
+    when the source can't be read; such results are kept in memory only.
+    """
+    module = inspect.getmodule(fn)
+    if module not in _source_versions:
+        try:
+            source = inspect.getsource(module)
+            _source_versions[module] = hashlib.blake2b(source.encode("utf-8"), digest_size=8).hexdigest()
+        except (OSError, TypeError):
+            _source_versions[module] = None
+    return _source_versions[module]
+
+def _empty():
+    return {"version": REGISTRY_FORMAT, "headers": {}, "roles": {}}
+
+class SchemaRegistry:
+    """
+    Resolved sheet layouts, shared by the ingestor, the dashboard and the
+    export, and persisted so recurring exports with the same layout are read
+    the same way from run to run without re-running the heuristics.
+
+    Results are stored per `kind` (one per heuristic and reader, since two
+    heuristics may read the same layout differently and readers number rows
+    differently) and per heuristic_version of the function that produced them:
+      headers["<kind>@<version>"]["<position>:<signature of the header row's cells>"] = position
+      roles["<kind>@<version>"][signature of the column names] = the resolver's role map
+    A header is recognised by its cells at a position some sheet of that kind
+    had the same header at; anything else goes to the detector, and only rows
+    it actually identifies are registered. Role maps must be JSON-serializable
+    and are shared, so callers must not modify them.
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH):
+        self.path = path or None
+        self._lock = threading.Lock()
+        self._data = self._read()
+        self._positions = {}
+        self._active = set() # "<kind>@<version>" keys used by this process
+
+    def _read(self):
+        if self.path is None:
+            return _empty()
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return _empty()
+        if not isinstance(data, dict) or data.get("version") != REGISTRY_FORMAT:
+            return _empty()
+        return data
+
+    def _save(self):
+        # Merge into what is on disk: other processes may have registered layouts meanwhile.
+        # Entries of an older version of one of our heuristics are dropped.
+        if self.path is None:
+            return
+        merged = self._read()
+        for section in ("headers", "roles"):
+            ours = {key for key in self._active if key in self._data[section] and not key.endswith("@None")}
+            kinds = {key.rsplit("@", 1)[0] for key in ours}
+            merged[section] = {key: entries for key, entries in merged[section].items()
+                               if key in ours or key.rsplit("@", 1)[0] not in kinds}
+            for key in ours:
+                merged[section].setdefault(key, {}).update(self._data[section][key])
+        tmp = f"{self.path}.tmp-{uuid.uuid4().hex}"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(merged, f)
+            os.replace(tmp, self.path)
+            for section in ("headers", "roles"):
+                merged[section].update({k: v for k, v in self._data[section].items() if k.endswith("@None")})
+            self._data = merged
+            self._positions.clear()
+        except OSError as e:
+            print(f"Warning: could not save schema registry: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def header_row(self, kind, rows, detect, default=0):
+        """
+        (position, hit) of the header among `rows`, the first rows of a sheet as
+        sequences of cell values. `detect(rows)` runs only for an unseen layout
+        and returns None when it finds no header; `default` is used then.
+        """
+        rows = list(rows)
+        key = f"{kind}@{heuristic_version(detect)}"
+        with self._lock:
+            self._active.add(key)
+            known = self._data["headers"].setdefault(key, {})
+            if key not in self._positions:
+                self._positions[key] = sorted(set(known.values()))
+            for pos in self._positions[key]:
+                if pos < len(rows) and f"{pos}:{layout_signature(rows[pos])}" in known:
+                    return pos, True
+
+            pos = detect(rows)
+            if pos is None or not 0 <= pos < len(rows):
+                return default, False
+            known[f"{pos}:{layout_signature(rows[pos])}"] = pos
+            self._positions.pop(key, None)
+            self._save()
+            return pos, False
+
+    def roles(self, kind, columns, resolve):
+        """`resolve(columns)` for this column layout, computed once per layout."""
+        signature = layout_signature(columns)
+        key = f"{kind}@{heuristic_version(resolve)}"
+        with self._lock:
+            self._active.add(key)
+            known = self._data["roles"].setdefault(key, {})
+            if signature not in known:
+                known[signature] = resolve(list(columns))
+                self._save()
+            return known[signature]
+
+# Shared by every caller in the process
+SCHEMAS = SchemaRegistry()
@@ -0,0 +1,185 @@
+import os
+import pickle
+import hashlib
+from bisect import bisect_left
+from collections import defaultdict
+from pmla_case_store import DEFAULT_STORE_PATH
+
+INDEX_VERSION = 1
+
+def index_path_for(store_path):
+    """Where a case store's search index lives: a file next to the store directory."""
+    return store_path.rstrip("\\/") + ".search_index.pkl"
+
+DEFAULT_INDEX_PATH = index_path_for(DEFAULT_STORE_PATH)
+
+# Ranking: which field matched, then how well (exact > prefix > substring)
+FIELD_WEIGHTS = {"ecir": 3, "person": 2, "location": 1}
+MATCH_WEIGHTS = {"exact": 3, "prefix": 2, "substring": 1}
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def indexed_terms(case):
+    """(field, lower-cased text) pairs a case is searchable by."""
+    terms = {("ecir", str(case["ecir_no"]).strip().lower())}
+    for p in case.get("persons_involved") or []:
+        if p is not None:
+            terms.add(("person", str(p).strip().lower()))
+    for s in case.get("searches") or []:
+        if s.get("location") is not None:
+            terms.add(("location", str(s["location"]).strip().lower()))
+    terms.discard(("ecir", ""))
+    return terms
+
+def _fingerprint(terms):
+    h = hashlib.blake2b(digest_size=8)
+    for field, text in sorted(terms):
+        h.update(f"{field}\x1f{text}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+class SearchIndex:
+    """
+    Trigram index over ECIR numbers, person names and search locations.
+
+    Distinct texts ("terms") are indexed once; each term posts to the cases that
+    carry it. A query of 3+ characters intersects the posting sets of its
+    trigrams and only verifies the surviving terms, so the cost follows the
+    number of candidate terms rather than cases x persons. Shorter queries fall
+    back to a prefix bisect plus a scan of the term vocabulary.
+    """
+
+    def __init__(self):
+        self.version = INDEX_VERSION
+        self.term_ids = {}              # text -> term id
+        self.terms = []                 # term id -> text (None once orphaned)
+        self.postings = {}              # term id -> {(ecir, field)}
+        self.grams = defaultdict(set)   # trigram -> {term id}
+        self.doc_terms = {}             # ecir -> {(term id, field)}
+        self.doc_hashes = {}            # ecir -> fingerprint of indexed terms
+        self._sorted_terms = None       # lazily built [(text, term id)] for prefix lookups
+
+    # --- Maintenance ---
+    def _term_id(self, text):
+        tid = self.term_ids.get(text)
+        if tid is None:
+            tid = len(self.terms)
+            self.terms.append(text)
+            self.term_ids[text] = tid
+            self.postings[tid] = set()
+            for g in trigrams(text):
+                self.grams[g].add(tid)
+            self._sorted_terms = None
+        return tid
+
+    def add(self, ecir, terms):
+        entries = set()
+        for field, text in terms:
+            tid = self._term_id(text)
+            self.postings[tid].add((ecir, field))
+            entries.add((tid, field))
+        self.doc_terms[ecir] = entries
+        self.doc_hashes[ecir] = _fingerprint(terms)
+
+    def remove(self, ecir):
+        for tid, field in self.doc_terms.pop(ecir, ()):
+            posting = self.postings[tid]
+            posting.discard((ecir, field))
+            if not posting:
+                # Orphaned term: drop it from the trigram and vocabulary maps
+                text = self.terms[tid]
+                for g in trigrams(text):
+                    self.grams[g].discard(tid)
+                    if not self.grams[g]:
+                        del self.grams[g]
+                del self.term_ids[text]
+                del self.postings[tid]
+                self.terms[tid] = None
+                self._sorted_terms = None
+        self.doc_hashes.pop(ecir, None)
+
+    def sync(self, cases):
+        """
+        Brings the index in line with `cases` ({ecir: case dict}), re-indexing only
+        cases whose searchable terms changed. Returns the number of cases touched.
+        """
+        touched = 0
+        for ecir in [e for e in self.doc_hashes if e not in cases]:
+            self.remove(ecir)
+            touched += 1
+        for ecir, case in cases.items():
+            terms = indexed_terms(case)
+            if self.doc_hashes.get(ecir) == _fingerprint(terms):
+                continue
+            self.remove(ecir)
+            self.add(ecir, terms)
+            touched += 1
+        return touched
+
+    # --- Queries ---
+    def _candidate_terms(self, q):
+        if len(q) >= 3:
+            sets = sorted((self.grams.get(g, set()) for g in trigrams(q)), key=len)
+            candidates = set(sets[0]).intersection(*sets[1:]) if sets else set()
+            return [tid for tid in candidates if q in self.terms[tid]]
+
+        # Short query: prefix hits via bisect, then substring hits from the vocabulary
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted((t, i) for i, t in enumerate(self.terms) if t is not None)
+        hits = []
+        pos = bisect_left(self._sorted_terms, (q, -1))
+        while pos < len(self._sorted_terms) and self._sorted_terms[pos][0].startswith(q):
+            hits.append(self._sorted_terms[pos][1])
+            pos += 1
+        seen = set(hits)
+        hits.extend(tid for t, tid in self._sorted_terms if tid not in seen and q in t)
+        return hits
+
+    def query(self, query, limit=None):
+        """Ranked ECIRs whose ECIR, person names or search locations contain `query`."""
+        q = str(query).strip().lower()
+        if not q:
+            return []
+        scores = {}
+        for tid in self._candidate_terms(q):
+            text = self.terms[tid]
+            kind = "exact" if text == q else "prefix" if text.startswith(q) else "substring"
+            for ecir, field in self.postings[tid]:
+                score = FIELD_WEIGHTS[field] * MATCH_WEIGHTS[kind]
+                if score > scores.get(ecir, 0):
+                    scores[ecir] = score
+        ranked = sorted(scores, key=lambda e: (-scores[e], e))
+        return ranked[:limit] if limit else ranked
+
+    # --- Persistence ---
+    def save(self, path=DEFAULT_INDEX_PATH):
+        self._sorted_terms = None
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path=DEFAULT_INDEX_PATH):
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        if getattr(index, "version", None) != INDEX_VERSION:
+            raise ValueError("search index version mismatch")
+        return index
+
+def load_index(cases, path=None, store_path=DEFAULT_STORE_PATH):
+    """
+    Loads the persisted index, syncs it with `cases` and re-saves it if anything
+    changed. `path` defaults to the index of the store at `store_path`.
+    """
+    path = path or index_path_for(store_path)
+    try:
+        index = SearchIndex.load(path)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError):
+        index = SearchIndex()
+    if index.sync(cases):
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"Warning: could not persist search index: {e}")
+    return index
@@ -0,0 +1,137 @@
+import random
+import argparse
+from datetime import datetime, timedelta
+from openpyxl import Workbook
+
+from pmla_data_ingestor import MASTER_SHEET
+
+ZONES = ["Delhi", "Mumbai", "Kolkata", "Chennai", "Hyderabad", "Bengaluru", "Lucknow", "Patna", "Jaipur", "Kochi"]
+FIRST_NAMES = ["Ram", "Sita", "Mohan", "Anil", "Sunita", "Rakesh", "Pooja", "Vijay", "Kavita", "Suresh", "Deepak", "Meena"]
+LAST_NAMES = ["Kumar", "Sharma", "Gupta", "Singh", "Devi", "Verma", "Yadav", "Reddy", "Nair", "Das", "Jain", "Patel"]
+CITIES = ["New Delhi", "Mumbai", "Kolkata", "Chennai", "Hyderabad", "Pune", "Noida", "Gurugram", "Patna", "Ranchi"]
+
+# Column headings as they appear in the EDOTS workbook (the ingestor and dashboard match on these)
+MASTER_COLUMNS = [
+    "Sl. No.", "ECIR No", "Date of ECIR", "Name of case", "Zonal Office", "Name of IO",
+    "Details of PoC identified (in Rs. Cr.), as per ECIR", "No. of searches conducted",
+    "No. of arrest", "Total value of PAOs issued", "Whether PC filed",
+]
+SHEET_LAYOUTS = [
+    ("search details", ["Sl. No.", "ECIR No", "Date of search", "Address of premises searched", "Name of person searched", "Name of officer"]),
+    ("arrest list", ["Sl. No.", "ECIR No", "Name of accused arrested", "Date of arrest", "Name of officer"]),
+    ("pao issued", ["Sl. No.", "ECIR No", "PAO No", "Date of PAO", "Value of PAO (Rs. Cr.)"]),
+    ("pc filed", ["Sl. No.", "ECIR No", "Date of filing PC", "Name of accused", "Court"]),
+]
+
+def ecir_number(i, zone):
+    return f"ECIR/{zone[:3].upper()}ZO/{i:05d}/{2015 + i % 10}"
+
+def name_variant(rng, name):
+    """The same person as different clerks typed them: titles, case, spacing, a dropped letter."""
+    roll = rng.random()
+    if roll < 0.15:
+        return "Shri " + name
+    if roll < 0.25:
+        return name.upper()
+    if roll < 0.30:
+        return name.replace(" ", "  ")
+    if roll < 0.35 and len(name) > 6:
+        cut = rng.randrange(1, len(name) - 1)
+        return name[:cut] + name[cut + 1:]
+    return name
+
+def messy_amount(rng, crores):
+    """Amount cells in the mixes seen in the wild: numbers, 'Rs. 1,234.50 Cr', lakh units, blanks."""
+    roll = rng.random()
+    if roll < 0.5:
+        return round(crores, 2)
+    if roll < 0.7:
+        return f"Rs. {crores:,.2f} Cr"
+    if roll < 0.8:
+        return f"{crores * 100:,.1f} lakh"
+    if roll < 0.9:
+        return "-"
+    return None
+
+def messy_date(rng, when):
+    roll = rng.random()
+    if roll < 0.6:
+        return when
+    if roll < 0.85:
+        return when.strftime("%d.%m.%Y")
+    if roll < 0.95:
+        return when.strftime("%d/%m/%Y")
+    return None
+
+def _title_rows(ws, rng, title, max_offset):
+    # Banner rows above the real header, as in the source workbook
+    for i in range(rng.randint(0, max_offset)):
+        ws.append([title] if i == 0 else [])
+
+def generate_workbook(path, cases=1000, sheets=8, max_header_offset=3, persons=None, seed=0):
+    """
+    Writes a synthetic EDOTS-style workbook to `path`: the master case list
+    followed by `sheets` secondary sheets cycling through the search, arrest,
+    PAO and PC layouts. Header rows sit below 0..`max_header_offset` banner
+    rows, amounts and dates are mixed-format, some ECIR cells are blank and
+    accused names recur with spelling variants. Same arguments, same workbook.
+    """
+    rng = random.Random(seed)
+    persons = persons or max(cases // 2, 10)
+    people = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {chr(65 + i % 26)}{i}" for i in range(persons)]
+    start = datetime(2015, 1, 1)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(MASTER_SHEET)
+    _title_rows(ws, rng, "List of PMLA cases", max_header_offset)
+    ws.append(MASTER_COLUMNS)
+    ecirs = []
+    for i in range(cases):
+        zone = rng.choice(ZONES)
+        ecir = ecir_number(i, zone)
+        ecirs.append(ecir)
+        poc = rng.lognormvariate(2, 2)
+        ws.append([
+            i + 1, ecir, messy_date(rng, start + timedelta(days=rng.randrange(3650))),
+            f"{rng.choice(LAST_NAMES)} {rng.choice(['Group', 'Infra', 'Traders', 'Exports'])} case",
+            zone, f"IO {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            messy_amount(rng, poc), rng.randint(0, 6), rng.randint(0, 4),
+            messy_amount(rng, poc * rng.random()), rng.choice(["Yes", "No", "Yes (Supplementary)", None]),
+        ])
+
+    for n in range(sheets):
+        name, columns = SHEET_LAYOUTS[n % len(SHEET_LAYOUTS)]
+        sheet_name = name if n < len(SHEET_LAYOUTS) else f"{name} {n // len(SHEET_LAYOUTS) + 1}"
+        ws = wb.create_sheet(sheet_name)
+        _title_rows(ws, rng, sheet_name.title(), max_header_offset)
+        ws.append(columns)
+        for r in range(rng.randint(cases // 2, cases * 2)):
+            ecir = rng.choice(ecirs) if rng.random() > 0.03 else None
+            values = {
+                "Sl. No.": r + 1, "ECIR No": ecir, "PAO No": f"PAO/{r}",
+                "Address of premises searched": f"{rng.randint(1, 300)}, Sector {rng.randint(1, 99)}, {rng.choice(CITIES)}",
+                "Name of officer": f"AD {rng.choice(LAST_NAMES)}",
+                "Value of PAO (Rs. Cr.)": messy_amount(rng, rng.lognormvariate(1, 2)),
+                "Court": f"Special Court (PMLA), {rng.choice(CITIES)}",
+            }
+            for col in columns:
+                if col.startswith("Date"):
+                    values[col] = messy_date(rng, start + timedelta(days=rng.randrange(3650)))
+                elif col.startswith("Name of") and col != "Name of officer":
+                    values[col] = name_variant(rng, rng.choice(people))
+            ws.append([values.get(col) for col in columns])
+
+    wb.save(path)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic EDOTS PMLA workbook for testing and benchmarks.")
+    parser.add_argument("path", help="Output .xlsx path")
+    parser.add_argument("--cases", type=int, default=1000, help="Rows in the master case list")
+    parser.add_argument("--sheets", type=int, default=8, help="Secondary sheets (search/arrest/PAO/PC layouts, cycled)")
+    parser.add_argument("--max-header-offset", type=int, default=3, help="Most banner rows above a sheet's header")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_workbook(args.path, args.cases, args.sheets, args.max_header_offset, seed=args.seed)
+    print(f"Wrote {args.path}")
@@ -0,0 +1,142 @@
+import io
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+from pmla_conversions import convert_frame, compact_frame
+from pmla_disk_cache import content_hash
+from pmla_instrument import stage
+from pmla_schema import SCHEMAS
+
+MAX_PARSED_SHEETS = 4
+MAIN_HEADER_SCAN_ROWS = 20
+
+def pick_main_sheet(sheet_names):
+    """The analytics sheet: the first one named like 'sheet 1', else the first sheet."""
+    return next((s for s in sheet_names if 'sheet 1' in s.lower()), sheet_names[0])
+
+def find_main_header(rows):
+    """
+    Header position among `rows` (the parsed header line, then the first data
+    rows): the first data row mentioning 'ECIR No' or 'Case No', else None
+    (the parsed header line is kept).
+    """
+    for i, row in enumerate(rows[1:], 1):
+        row_str = " ".join([str(x) for x in row if pd.notna(x)])
+        if "ECIR No" in row_str or "Case No" in row_str:
+            return i
+    return None
+
+def parse_workbook(file):
+    xls = pd.ExcelFile(file)
+    
+    # 1. Automatic Main Sheet Detection
+    # Only the main sheet is parsed here; the others are read on demand through LazyWorkbook
+    df = xls.parse(pick_main_sheet(xls.sheet_names))
+    
+    # 2. Header Cleanup
+    # Scan first 20 rows for "ECIR" to find likely header; header rows already
+    # seen in this process come straight from the schema registry
+    rows = [list(df.columns)] + df.head(MAIN_HEADER_SCAN_ROWS).values.tolist()
+    header_idx = SCHEMAS.header_row("main_sheet", rows, find_main_header)[0]
+
+    if header_idx > 0:
+        df.columns = df.iloc[header_idx - 1]
+        df = df.iloc[header_idx:].reset_index(drop=True)
+
+    # Standardize Column Names
+    df.columns = [str(c).strip() for c in df.columns]
+
+    # 3. Type Conversion & Enrichment
+    # Whole-column parsing of amounts, dates and labels; per-column parse
+    # failures travel with the frame for the data-quality panel
+    df.attrs["conversion_report"] = convert_frame(df)
+
+    # 4. Memory Compaction
+    # Low-cardinality text as categoricals, counts and years as small ints;
+    # bytes saved per column are kept for the diagnostics panel
+    df.attrs["compaction_report"] = compact_frame(df)
+
+    return df
+
+def load_main_frame(data, cache=None, shared=False):
+    """
+    The dashboard's processed main sheet for workbook bytes, through the disk
+    cache when given. With `shared`, the frame is served memory-mapped from the
+    cache entry (see WorkbookCache.get) and must be treated as read-only.
+    """
+    with stage("process_data", bytes=len(data)) as s:
+        if cache is None:
+            df = parse_workbook(io.BytesIO(data))
+        else:
+            key = content_hash(data)
+            df = cache.get(key, shared=shared)
+            s.set(cache_hit=df is not None)
+            if df is None:
+                df = parse_workbook(io.BytesIO(data))
+                with stage("cache_write", key=key):
+                    df = cache.put(key, df)
+                if shared:
+                    # Re-open what was just written so this in-memory copy can be dropped
+                    mapped = cache.get(key, shared=True)
+                    if mapped is not None:
+                        df = mapped
+        s.add_rows(len(df))
+        return df
+
+class LazyWorkbook:
+    """
+    Read-on-demand view of an uploaded workbook.
+
+    Sheet names and dimensions come straight from the workbook metadata; a
+    sheet is parsed into a DataFrame only the first time something asks for
+    it. Parsed sheets are memoized with LRU eviction (`max_sheets`) and, when
+    a WorkbookCache is given, persisted there so other processes skip the parse.
+    Safe to share between sessions.
+    """
+
+    def __init__(self, data, cache=None, key=None, max_sheets=MAX_PARSED_SHEETS):
+        self._xls = pd.ExcelFile(io.BytesIO(data))
+        self._cache, self._key = cache, key
+        self._max_sheets = max_sheets
+        self._parsed = OrderedDict()
+        self._lock = threading.Lock()
+        self.sheet_names = list(self._xls.sheet_names)
+
+    def dimensions(self, sheet_name):
+        """
+        (rows, columns) as recorded in the sheet's metadata. Sheets written
+        without a <dimension> record give the size of the parsed sheet if it
+        has been read already, else (None, None) for unknown.
+        """
+        with self._lock:
+            ws = self._xls.book[sheet_name]
+            rows, cols = ws.max_row, ws.max_column
+            frame = self._parsed.get(sheet_name)
+        if (rows is None or cols is None) and frame is not None:
+            rows, cols = len(frame) + 1, frame.shape[1] # +1: the header row
+        return rows, cols
+
+    def sheet(self, sheet_name):
+        with self._lock:
+            if sheet_name in self._parsed:
+                self._parsed.move_to_end(sheet_name)
+                return self._parsed[sheet_name]
+
+            frame = None
+            if self._cache is not None:
+                frame = self._cache.get_sheet(self._key, sheet_name)
+            if frame is None:
+                with stage("sheet_parse", sheet=sheet_name) as s:
+                    frame = self._xls.parse(sheet_name)
+                    s.add_rows(len(frame))
+                if self._cache is not None:
+                    frame = self._cache.put_sheet(self._key, sheet_name, frame)
+
+            self._parsed[sheet_name] = frame
+            while len(self._parsed) > self._max_sheets:
+                self._parsed.popitem(last=False)
+            return frame
+
+    def __getitem__(self, sheet_name):
+        return self.sheet(sheet_name)